@@ -50,7 +50,10 @@ setup(
     entry_points = {
         'console_scripts' : [
                              'toxaway-server = toxaway.scripts.server:Main',
-                             'toxaway-load = toxaway.scripts.bulk:Main'
+                             'toxaway-load = toxaway.scripts.bulk:Main',
+                             'toxaway-catalog = toxaway.scripts.catalog:Main',
+                             'toxaway-migrate-state = toxaway.scripts.migrate_state:Main',
+                             'toxaway-create = toxaway.scripts.create:Main'
                              ]
     }
 )
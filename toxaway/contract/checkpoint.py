@@ -0,0 +1,207 @@
+#!/usr/bin/env python
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import contextlib
+import fcntl
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+import toxaway.models.contract
+
+import logging
+logger = logging.getLogger(__name__)
+
+__all__ = ['CreationCheckpoint', 'CheckpointBusyException']
+
+# XXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXX
+# XXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXX
+class CheckpointBusyException(Exception) :
+    pass
+
+# XXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXX
+# XXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXX
+class CreationCheckpoint(object) :
+    """The progress of a contract creation; the checkpoint is written
+    to the Contract content path after each stage so a creation that
+    failed or was interrupted resumes at the stage that did not finish.
+    A creation is identified by the creator, the contract name, the code
+    and the services, so repeating the same request resumes it. An open
+    checkpoint holds a lock on the creation, a second creation with the
+    same identity is refused while the first runs
+    """
+
+    __stages__ = ['register', 'provision', 'initialize', 'save']
+
+    # -----------------------------------------------------------------
+    @staticmethod
+    def __directory__(config) :
+        root = toxaway.models.contract.Contract.__root_directory__(config)
+        return os.path.join(root, '__pending__')
+
+    # -----------------------------------------------------------------
+    @staticmethod
+    def creation_id(creator_id, contract_name, code_hash, enclave_ids, pservice_ids) :
+        identity = json.dumps([creator_id, contract_name, code_hash, sorted(enclave_ids), sorted(pservice_ids)])
+        return hashlib.sha256(identity.encode('utf8')).hexdigest()[:32]
+
+    # -----------------------------------------------------------------
+    @classmethod
+    def open(cls, config, creation_id) :
+        """load the checkpoint for a creation or start a new one, raises
+        CheckpointBusyException if the creation is running elsewhere; the
+        checkpoint must be closed
+        """
+        checkpoint_dir = CreationCheckpoint.__directory__(config)
+        if not os.path.isdir(checkpoint_dir) :
+            os.makedirs(checkpoint_dir, exist_ok=True)
+
+        file_name = os.path.join(checkpoint_dir, '{0}.json'.format(creation_id))
+        checkpoint = cls(file_name)
+        checkpoint.creation_id = creation_id
+        checkpoint.__lock__(os.path.join(checkpoint_dir, '{0}.lock'.format(creation_id)))
+
+        if os.path.exists(file_name) :
+            with open(file_name, "r") as cf :
+                checkpoint.deserialize(cf.read())
+            checkpoint.resumed = True
+
+        return checkpoint
+
+    # -----------------------------------------------------------------
+    def __init__(self, file_name) :
+        self.file_name = file_name
+        self.creation_id = None
+        self.resumed = False
+        self.completed = []
+        self.timings = {}
+        self.values = {}
+        self.error = None
+        self.__lock_file__ = None
+
+    # -----------------------------------------------------------------
+    def __lock__(self, lock_file_name) :
+        """take the lock for the creation; the lock file is removed with
+        the checkpoint, so a lock taken on a file that was removed in the
+        meantime is taken again
+        """
+        while True :
+            lock_file = open(lock_file_name, "a")
+            try :
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError :
+                lock_file.close()
+                raise CheckpointBusyException('creation {0} is in progress'.format(self.creation_id))
+
+            try :
+                if os.fstat(lock_file.fileno()).st_ino == os.stat(lock_file_name).st_ino :
+                    self.__lock_file__ = lock_file
+                    return
+            except FileNotFoundError :
+                pass
+            lock_file.close()
+
+    # -----------------------------------------------------------------
+    def close(self) :
+        """release the lock on the creation
+        """
+        if self.__lock_file__ is not None :
+            self.__lock_file__.close()
+            self.__lock_file__ = None
+
+    # -----------------------------------------------------------------
+    def done(self, stage) :
+        return stage in self.completed
+
+    # -----------------------------------------------------------------
+    @property
+    def next_stage(self) :
+        for stage in CreationCheckpoint.__stages__ :
+            if stage not in self.completed :
+                return stage
+        return None
+
+    # -----------------------------------------------------------------
+    @contextlib.contextmanager
+    def stage(self, stage) :
+        """run one stage; the time it took, and whether it finished or
+        failed, is recorded and the checkpoint is written
+        """
+        logger.info('creation %s; start stage %s', self.creation_id, stage)
+        start = time.time()
+        try :
+            yield self.values
+        except Exception as e :
+            self.timings[stage] = self.timings.get(stage, 0) + time.time() - start
+            self.error = { 'stage' : stage, 'message' : str(e) }
+            self.save()
+            raise
+
+        self.timings[stage] = self.timings.get(stage, 0) + time.time() - start
+        self.completed.append(stage)
+        self.error = None
+        self.save()
+        logger.info('creation %s; finished stage %s in %.2f seconds', self.creation_id, stage, self.timings[stage])
+
+    # -----------------------------------------------------------------
+    def update(self, **values) :
+        """record values in the middle of a stage
+        """
+        self.values.update(values)
+        self.save()
+
+    # -----------------------------------------------------------------
+    def save(self) :
+        checkpoint_dir = os.path.dirname(self.file_name)
+        if not os.path.isdir(checkpoint_dir) :
+            os.makedirs(checkpoint_dir)
+
+        with tempfile.NamedTemporaryFile(mode='w', dir=checkpoint_dir, prefix='.checkpoint-', delete=False) as cf :
+            cf.write(self.serialize())
+        os.replace(cf.name, self.file_name)
+
+    # -----------------------------------------------------------------
+    def remove(self) :
+        """remove the checkpoint of a finished creation and its lock file,
+        the lock is held until the checkpoint is closed
+        """
+        file_names = [self.file_name]
+        if self.__lock_file__ is not None :
+            file_names.append(self.__lock_file__.name)
+
+        for file_name in file_names :
+            try :
+                os.remove(file_name)
+            except FileNotFoundError :
+                pass
+
+    # -----------------------------------------------------------------
+    def deserialize(self, serialized) :
+        checkpoint_info = json.loads(serialized)
+        self.completed = checkpoint_info['completed']
+        self.timings = checkpoint_info['timings']
+        self.values = checkpoint_info['values']
+        self.error = checkpoint_info.get('error')
+
+    # -----------------------------------------------------------------
+    def serialize(self) :
+        serialized = dict()
+        serialized['creation_id'] = self.creation_id
+        serialized['completed'] = self.completed
+        serialized['timings'] = self.timings
+        serialized['values'] = self.values
+        serialized['error'] = self.error
+        return json.dumps(serialized, indent=2)
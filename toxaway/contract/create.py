@@ -17,8 +17,8 @@
 import os, sys
 import logging
 import argparse
+import concurrent.futures
 import random
-import tempfile
 import time
 
 import pdo.common.config as pconfig
@@ -32,42 +32,67 @@ from pdo.contract import ContractState
 from pdo.contract import Contract
 from pdo.contract import register_contract
 from pdo.contract import add_enclave_to_contract
-from pdo.service_client.enclave import EnclaveServiceClient
-from pdo.service_client.provisioning import ProvisioningServiceClient
 
 import toxaway.models.contract
+from toxaway.contract.checkpoint import CreationCheckpoint, CheckpointBusyException
+from toxaway.models.ledger import LedgerClient
+from toxaway.models.scheduler import EnclaveScheduler
+from toxaway.models.state import StateCache
 
 logger = logging.getLogger(__name__)
 
 ## -----------------------------------------------------------------
-def AddEnclaveSecrets(ledger_config, contract_id, client_keys, enclaveclients, provclients) :
-    secrets = {}
-    encrypted_state_encryption_keys = {}
-    for enclaveclient in enclaveclients:
-        psecrets = []
-        for provclient in provclients:
-            # Get a pspk:esecret pair from the provisioning service for each enclave
-            sig_payload = pcrypto.string_to_byte_array(enclaveclient.enclave_id + contract_id)
-            secretinfo = provclient.get_secret(enclaveclient.enclave_id,
-                                               contract_id,
-                                               client_keys.verifying_key,
-                                               client_keys.sign(sig_payload))
-            logger.debug("pservice secretinfo: %s", secretinfo)
-
-            # Add this pspk:esecret pair to the list
-            psecrets.append(secretinfo)
-
-        # Print all of the secret pairs generated for this particular enclave
-        logger.debug('psecrets for enclave %s : %s', enclaveclient.enclave_id, psecrets)
-
-        # Verify those secrets with the enclave
+class EnclaveAddException(Exception) :
+    """raised when some of the enclaves could not be added to the
+    contract, failures maps the enclave id to the error
+    """
+    def __init__(self, failures) :
+        self.failures = failures
+        super(EnclaveAddException, self).__init__(
+            'failed to add {0} enclaves to the contract; {1}'.format(
+                len(failures), '; '.join(map(lambda i : '{0}: {1}'.format(*i), failures.items()))))
+
+## -----------------------------------------------------------------
+def __result__(future, deadline, operation) :
+    """wait for a future until the deadline, raise an exception naming
+    the operation if it does not finish in time
+    """
+    timeout = None if deadline is None else max(0, deadline - time.time())
+    try :
+        return future.result(timeout)
+    except concurrent.futures.TimeoutError :
+        raise Exception('timed out waiting for {0}'.format(operation))
+
+## -----------------------------------------------------------------
+def AddEnclaveSecrets(ledger_config, contract_id, client_keys, enclaveclients, provclients,
+                      max_workers=8, secret_timeout=None, verify_timeout=None,
+                      concurrent_add=False, add_timeout=None, added=None) :
+    """get the secrets for every enclave from every provisioning service
+    and verify them with the enclaves; requests run concurrently but the
+    secrets keep the order of the enclave and provisioning service lists.
+    the enclaves are added to the contract one at a time in order or,
+    with concurrent_add, all at once; added is called with the enclave id
+    and encrypted state key of each enclave once it is on the ledger.
+    EnclaveAddException reports the enclaves that could not be added
+    """
+    def get_secret(enclaveclient, provclient) :
+        # Get a pspk:esecret pair from the provisioning service for the enclave
+        sig_payload = pcrypto.string_to_byte_array(enclaveclient.enclave_id + contract_id)
+        secretinfo = provclient.get_secret(enclaveclient.enclave_id,
+                                           contract_id,
+                                           client_keys.verifying_key,
+                                           client_keys.sign(sig_payload))
+        logger.debug("pservice secretinfo: %s", secretinfo)
+        return secretinfo
+
+    def verify_secrets(enclaveclient, psecrets) :
+        # Verify the secrets with the enclave
         esresponse = enclaveclient.verify_secrets(contract_id, client_keys.verifying_key, psecrets)
         logger.debug("verify_secrets response: %s", esresponse)
+        return esresponse
 
-        # Store the ESEK mapping in a dictionary key'd by the enclave's public key (ID)
-        encrypted_state_encryption_keys[enclaveclient.enclave_id] = esresponse['encrypted_state_encryption_key']
-
-        # Add this spefiic enclave to the contract
+    def add_enclave(enclaveclient, psecrets, esresponse) :
+        # Add this specific enclave to the contract
         add_enclave_to_contract(ledger_config,
                                 client_keys,
                                 contract_id,
@@ -76,19 +101,83 @@ def AddEnclaveSecrets(ledger_config, contract_id, client_keys, enclaveclients, p
                                 esresponse['encrypted_state_encryption_key'],
                                 esresponse['signature'])
 
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+    try :
+        secret_deadline = None if secret_timeout is None else time.time() + secret_timeout
+        secret_futures = []
+        for enclaveclient in enclaveclients :
+            secret_futures.append([executor.submit(get_secret, enclaveclient, p) for p in provclients])
+
+        verify_deadline = None if verify_timeout is None else time.time() + verify_timeout
+        verify_futures = []
+        for (enclaveclient, futures) in zip(enclaveclients, secret_futures) :
+            psecrets = [__result__(f, secret_deadline, 'provisioning secrets') for f in futures]
+
+            # Print all of the secret pairs generated for this particular enclave
+            logger.debug('psecrets for enclave %s : %s', enclaveclient.enclave_id, psecrets)
+            verify_futures.append((psecrets, executor.submit(verify_secrets, enclaveclient, psecrets)))
+
+        esresponses = []
+        for (enclaveclient, (psecrets, future)) in zip(enclaveclients, verify_futures) :
+            esresponses.append((psecrets, __result__(future, verify_deadline, 'secret verification')))
+
+        if concurrent_add :
+            # submit every transaction, then wait for the group
+            add_deadline = None if add_timeout is None else time.time() + add_timeout
+            add_futures = []
+            for (enclaveclient, (psecrets, esresponse)) in zip(enclaveclients, esresponses) :
+                add_futures.append(executor.submit(add_enclave, enclaveclient, psecrets, esresponse))
+
+            failures = {}
+            for (enclaveclient, (psecrets, esresponse), future) in zip(enclaveclients, esresponses, add_futures) :
+                try :
+                    __result__(future, add_deadline, 'enclave registration')
+                except Exception as e :
+                    logger.warn('failed to add enclave %s to contract; %s', enclaveclient.enclave_id, str(e))
+                    failures[enclaveclient.enclave_id] = str(e)
+                    continue
+                if added is not None :
+                    added(enclaveclient.enclave_id, esresponse['encrypted_state_encryption_key'])
+
+            if failures :
+                raise EnclaveAddException(failures)
+        else :
+            for (enclaveclient, (psecrets, esresponse)) in zip(enclaveclients, esresponses) :
+                add_enclave(enclaveclient, psecrets, esresponse)
+                if added is not None :
+                    added(enclaveclient.enclave_id, esresponse['encrypted_state_encryption_key'])
+    finally :
+        executor.shutdown(wait=False)
+
+    # Store the ESEK mapping in a dictionary key'd by the enclave's public key (ID)
+    encrypted_state_encryption_keys = {}
+    for (enclaveclient, (psecrets, esresponse)) in zip(enclaveclients, esresponses) :
+        encrypted_state_encryption_keys[enclaveclient.enclave_id] = esresponse['encrypted_state_encryption_key']
+
     return encrypted_state_encryption_keys
 
 ## -----------------------------------------------------------------
-def CreateContract(ledger_config, client_keys, enclaveclients, contract) :
-    # Choose one enclave at random to use to create the contract
-    enclaveclient = random.choice(enclaveclients)
+def CreateContract(ledger_config, client_keys, enclaveclients, contract, scheduler=None, initialized=None) :
+    # Choose one enclave to use to create the contract, at random unless a
+    # scheduler is provided
+    if scheduler is None :
+        enclaveclient = random.choice(enclaveclients)
+    else :
+        clients = dict(map(lambda c : (c.enclave_id, c), enclaveclients))
+        enclaveclient = clients[scheduler.select(clients.keys())]
 
     logger.info('Requesting that the enclave initialize the contract...')
     initialize_request = contract.create_initialize_request(client_keys, enclaveclient)
-    initialize_response = initialize_request.evaluate()
+    if scheduler is None :
+        initialize_response = initialize_request.evaluate()
+    else :
+        with scheduler.track(enclaveclient.enclave_id) :
+            initialize_response = initialize_request.evaluate()
     contract.set_state(initialize_response.raw_state)
 
     logger.info('Contract state created successfully')
+    if initialized is not None :
+        initialized(contract)
 
     logger.info('Saving the initial contract state in the ledger...')
 
@@ -108,56 +197,181 @@ def Create(config, client_profile, contract_name, contract_code, eservices, pser
     contract_code -- toxaway.models.contract_code.ContractCode
     eservices -- toxaway.models.eservice.EnclaveServiceList
     pservices -- toxaway.models.pservice.ProvisioningServiceList
-    """
 
-    ledger_config = config['Sawtooth']
-    contract_config = config['ContentPaths']
-    state_directory = contract_config['State']
+    creation runs in stages (register, provision, initialize, save) and
+    a checkpoint is kept after each one; if a stage fails None is
+    returned and calling Create again with the same arguments resumes at
+    that stage
+    """
 
     client_keys = client_profile.keys
     provisioning_service_keys = list(pservices.identities())
 
+    enclaveclients = []
+    for eservice in eservices :
+        enclaveclients.append(eservice.eservice_client(config))
+
+    provclients = []
+    for pservice in pservices :
+        provclients.append(pservice.pservice_client(config))
+
+    creation_id = CreationCheckpoint.creation_id(
+        client_keys.identity, contract_name, contract_code.code_hash,
+        map(lambda e : e.enclave_id, eservices), provisioning_service_keys)
     try :
-        pdo_code_object = contract_code.create_pdo_contract()
-    except Exception as e :
-        logger.error('failed to create the contract object; %s', str(e))
+        checkpoint = CreationCheckpoint.open(config, creation_id)
+    except CheckpointBusyException as e :
+        logger.error('failed to start the creation of %s; %s', contract_name, str(e))
         return None
 
     try :
-        pdo_contract_id = register_contract(
-            ledger_config, client_keys, pdo_code_object, provisioning_service_keys)
+        return __create__(config, checkpoint, client_keys, contract_name, contract_code,
+                          enclaveclients, provclients, provisioning_service_keys)
+    finally :
+        checkpoint.close()
 
-        logger.info('Registered contract %s with id %s', contract_code.name, pdo_contract_id)
-        pdo_contract_state = ContractState.create_new_state(pdo_contract_id)
-        contract = Contract(pdo_code_object, pdo_contract_state, pdo_contract_id, client_keys.identity)
-    except Exception as e :
-        logger.error('failed to register the contract; %s', str(e))
-        return None
+## -----------------------------------------------------------------
+def __create__(config, checkpoint, client_keys, contract_name, contract_code,
+               enclaveclients, provclients, provisioning_service_keys) :
+    """run the stages of a creation that are not done yet
+    """
+    ledger_config = config['Sawtooth']
 
-    logger.info('Contract created')
+    if checkpoint.resumed :
+        logger.info('resume creation of %s at stage %s', contract_name, checkpoint.next_stage)
 
-    enclaveclients = []
-    for eservice in eservices :
-        enclaveclients.append(eservice.eservice_client)
+    try :
+        pdo_code_object = contract_code.create_pdo_contract(config)
+    except Exception as e :
+        logger.error('failed to create the contract object; %s', str(e))
+        return None
 
-    provclients = []
-    for pservice in pservices :
-        provclients.append(pservice.pservice_client)
+    # -------------------- register --------------------
+    if not checkpoint.done('register') :
+        try :
+            with checkpoint.stage('register') as values :
+                values['contract_id'] = register_contract(
+                    ledger_config, client_keys, pdo_code_object, provisioning_service_keys)
+                values['code_nonce'] = pdo_code_object.nonce
+                logger.info('Registered contract %s with id %s', contract_code.name, values['contract_id'])
+        except Exception as e :
+            logger.error('failed to register the contract; %s', str(e))
+            return None
+
+    pdo_contract_id = checkpoint.values['contract_id']
+    if pdo_code_object.nonce != checkpoint.values['code_nonce'] :
+        pdo_code_object = ContractCode(contract_code.code, contract_code.name, checkpoint.values['code_nonce'])
+
+    pdo_contract_state = ContractState.create_new_state(pdo_contract_id)
+    contract = Contract(pdo_code_object, pdo_contract_state, pdo_contract_id, client_keys.identity)
 
-    encrypted_state_encryption_keys = AddEnclaveSecrets(
-        ledger_config, pdo_contract_id, client_keys, enclaveclients, provclients)
+    logger.info('Contract created')
 
+    # -------------------- provision --------------------
+    if not checkpoint.done('provision') :
+        provisioning_config = config.get('Provisioning', {})
+
+        # each enclave is recorded as it is added so a retry adds only the
+        # missing ones; an addition that timed out may have reached the
+        # ledger anyway, so a resumed creation also checks the ledger
+        added_enclaves = dict(checkpoint.values.get('added_enclaves', {}))
+        if checkpoint.resumed :
+            added_enclaves.update(__enclaves_on_ledger__(config, pdo_contract_id))
+
+        def enclave_added(enclave_id, encrypted_key) :
+            added_enclaves[enclave_id] = encrypted_key
+            checkpoint.update(added_enclaves=added_enclaves)
+
+        try :
+            with checkpoint.stage('provision') as values :
+                missing = [c for c in enclaveclients if c.enclave_id not in added_enclaves]
+                if len(missing) < len(enclaveclients) :
+                    logger.info('%d of %d enclaves already added', len(enclaveclients) - len(missing), len(enclaveclients))
+                if missing :
+                    AddEnclaveSecrets(
+                        ledger_config, pdo_contract_id, client_keys, missing, provclients,
+                        max_workers=provisioning_config.get('Threads', 8),
+                        secret_timeout=provisioning_config.get('SecretTimeout'),
+                        verify_timeout=provisioning_config.get('VerifyTimeout'),
+                        concurrent_add=provisioning_config.get('ConcurrentEnclaveAdd', False),
+                        add_timeout=provisioning_config.get('EnclaveAddTimeout'),
+                        added=enclave_added)
+
+                values['encryption_keys'] = dict(
+                    map(lambda c : (c.enclave_id, added_enclaves[c.enclave_id]), enclaveclients))
+        except Exception as e :
+            logger.error('failed to provision the enclaves; %s', str(e))
+            return None
+
+    encrypted_state_encryption_keys = checkpoint.values['encryption_keys']
     for enclave_id in encrypted_state_encryption_keys :
         encrypted_key = encrypted_state_encryption_keys[enclave_id]
         contract.set_state_encryption_key(enclave_id, encrypted_key)
 
-    CreateContract(ledger_config, client_keys, enclaveclients, contract)
-
-    contract.contract_state.save_to_cache(data_dir = state_directory)
-    logger.info('state saved to cache')
+    # -------------------- initialize --------------------
+    state_cache = StateCache.open(config)
+
+    def initialized(contract) :
+        # keep the initial state before it is committed so a creation
+        # interrupted during the commit can check the ledger for it
+        state_cache.save(contract.contract_state)
+        checkpoint.update(state_hash=StateCache.state_hash(contract.contract_state))
+        logger.info('state saved to cache')
+
+    if not checkpoint.done('initialize') :
+        try :
+            with checkpoint.stage('initialize') :
+                if not __committed__(ledger_config, pdo_contract_id, checkpoint.values.get('state_hash')) :
+                    CreateContract(ledger_config, client_keys, enclaveclients, contract,
+                                   EnclaveScheduler.open(config), initialized)
+        except Exception as e :
+            logger.error('failed to initialize the contract; %s', str(e))
+            return None
+
+    # -------------------- save --------------------
+    try :
+        with checkpoint.stage('save') :
+            state = state_cache.read(pdo_contract_id, checkpoint.values['state_hash'])
+            if state is None :
+                raise Exception('initial state is missing from the state cache')
+            contract.contract_state = state
+
+            # hand the contract over in memory, the state was just saved and
+            # the ledger has nothing newer
+            toxaway_contract = toxaway.models.contract.Contract.from_pdo_contract(config, contract, contract_name)
+    except Exception as e :
+        logger.error('failed to save the contract; %s', str(e))
+        return None
 
-    with tempfile.NamedTemporaryFile() as pdo_temp :
-        contract.save_to_file(pdo_temp.name)
-        toxaway_contract = toxaway.models.contract.Contract.import_contract(config, pdo_temp, contract_name)
+    logger.info('contract %s created; stage timings %s', contract_name,
+                ', '.join(map(lambda s : '{0}={1:.2f}s'.format(s, checkpoint.timings.get(s, 0)), CreationCheckpoint.__stages__)))
+    checkpoint.remove()
 
     return toxaway_contract
+
+## -----------------------------------------------------------------
+def __enclaves_on_ledger__(config, contract_id) :
+    """return the encrypted state keys of the enclaves the ledger lists
+    for the contract
+    """
+    try :
+        contract_info = LedgerClient.open(config).contract_info(contract_id)
+        enclaves_info = contract_info.get('enclaves_info') or []
+    except Exception as e :
+        logger.info('failed to retrieve the enclaves of contract %s; %s', contract_id, str(e))
+        return {}
+
+    return dict(map(lambda e : (e['contract_enclave_id'], e['encrypted_contract_state_encryption_key']), enclaves_info))
+
+## -----------------------------------------------------------------
+def __committed__(ledger_config, contract_id, state_hash) :
+    """check whether an initial state recorded by an earlier attempt
+    reached the ledger
+    """
+    if state_hash is None :
+        return False
+
+    try :
+        return ContractState.get_current_state_hash(ledger_config, contract_id) == state_hash
+    except Exception :
+        return False
@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import collections
+import threading
+import time
+
+import logging
+logger = logging.getLogger(__name__)
+
+__all__ = ['LRUCache']
+
+# XXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXX
+# XXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXX
+class LRUCache(object) :
+    """A thread safe, in-process cache with least recently used
+    eviction; entries may be bounded by count, by total size and by
+    age (time to live in seconds)
+    """
+
+    # -----------------------------------------------------------------
+    def __init__(self, max_entries=None, max_bytes=None, ttl=None) :
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self.__lock__ = threading.RLock()
+        self.__entries__ = collections.OrderedDict()
+        self.__bytes__ = 0
+
+    # -----------------------------------------------------------------
+    def __len__(self) :
+        with self.__lock__ :
+            return len(self.__entries__)
+
+    # -----------------------------------------------------------------
+    def __contains__(self, key) :
+        with self.__lock__ :
+            return key in self.__entries__
+
+    # -----------------------------------------------------------------
+    def keys(self) :
+        with self.__lock__ :
+            return list(self.__entries__.keys())
+
+    # -----------------------------------------------------------------
+    def get(self, key, default=None, validate=None) :
+        """return the value stored for key; entries that have expired or
+        that fail the optional validate predicate are dropped and
+        counted as a miss
+        """
+        with self.__lock__ :
+            entry = self.__entries__.get(key)
+            if entry is not None :
+                (value, size, timestamp) = entry
+                expired = self.ttl is not None and time.time() - timestamp > self.ttl
+                if expired or (validate is not None and not validate(value)) :
+                    self.__discard__(key)
+                else :
+                    self.__entries__.move_to_end(key)
+                    self.hits += 1
+                    return value
+
+            self.misses += 1
+            return default
+
+    # -----------------------------------------------------------------
+    def put(self, key, value, size=0) :
+        with self.__lock__ :
+            if key in self.__entries__ :
+                self.__discard__(key)
+
+            self.__entries__[key] = (value, size, time.time())
+            self.__bytes__ += size
+            self.__evict__()
+
+    # -----------------------------------------------------------------
+    def remove(self, key) :
+        with self.__lock__ :
+            if key in self.__entries__ :
+                self.__discard__(key)
+
+    # -----------------------------------------------------------------
+    def remove_if(self, predicate) :
+        """drop every entry whose key satisfies the predicate
+        """
+        with self.__lock__ :
+            for key in [k for k in self.__entries__.keys() if predicate(k)] :
+                self.__discard__(key)
+
+    # -----------------------------------------------------------------
+    def clear(self) :
+        with self.__lock__ :
+            self.__entries__.clear()
+            self.__bytes__ = 0
+
+    # -----------------------------------------------------------------
+    def statistics(self) :
+        with self.__lock__ :
+            return {
+                'entries' : len(self.__entries__),
+                'bytes' : self.__bytes__,
+                'hits' : self.hits,
+                'misses' : self.misses,
+                'evictions' : self.evictions,
+            }
+
+    # -----------------------------------------------------------------
+    def __discard__(self, key) :
+        (value, size, timestamp) = self.__entries__.pop(key)
+        self.__bytes__ -= size
+
+    # -----------------------------------------------------------------
+    def __evict__(self) :
+        while self.__entries__ :
+            over_count = self.max_entries is not None and len(self.__entries__) > self.max_entries
+            over_bytes = self.max_bytes is not None and self.__bytes__ > self.max_bytes
+            if not (over_count or over_bytes) :
+                break
+
+            key = next(iter(self.__entries__))
+            self.__discard__(key)
+            self.evictions += 1
@@ -0,0 +1,257 @@
+#!/usr/bin/env python
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import base64
+import collections
+import json
+import os
+import sqlite3
+import threading
+
+import logging
+logger = logging.getLogger(__name__)
+
+__all__ = ['Catalog', 'CatalogEntry']
+
+CatalogEntry = collections.namedtuple(
+    'CatalogEntry', ['kind', 'identity', 'name', 'url', 'code_hash', 'creator', 'file_name', 'mtime', 'record'])
+
+# XXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXX
+# XXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXX
+class Catalog(object) :
+    """A persistent index of the listing fields for the objects
+    stored in the content directories; the model save methods keep
+    the catalog current and the list classes query it rather than
+    parsing every file
+    """
+
+    __catalogs__ = {}
+    __catalogs_lock__ = threading.Lock()
+
+    __columns__ = ', '.join(CatalogEntry._fields)
+
+    # -----------------------------------------------------------------
+    @staticmethod
+    def __catalog_file_name__(config) :
+        path_config = config.get('ContentPaths', {})
+        return os.path.realpath(
+            path_config.get('Catalog', os.path.join(os.environ['HOME'], '.toxaway', 'catalog.db')))
+
+    # -----------------------------------------------------------------
+    @classmethod
+    def open(cls, config) :
+        """return the catalog for the configuration, the connection is
+        shared by all threads in the process
+        """
+        catalog_file = Catalog.__catalog_file_name__(config)
+        with Catalog.__catalogs_lock__ :
+            catalog = Catalog.__catalogs__.get(catalog_file)
+            if catalog is None :
+                catalog = cls(catalog_file)
+                Catalog.__catalogs__[catalog_file] = catalog
+
+        return catalog
+
+    # -----------------------------------------------------------------
+    def __init__(self, catalog_file) :
+        catalog_dir = os.path.dirname(catalog_file)
+        if not os.path.isdir(catalog_dir) :
+            os.makedirs(catalog_dir)
+
+        logger.info('open catalog %s', catalog_file)
+        self.file_name = catalog_file
+        self.__lock__ = threading.Lock()
+        self.__connection__ = sqlite3.connect(catalog_file, check_same_thread=False)
+
+        with self.__lock__, self.__connection__ :
+            self.__connection__.execute(
+                'CREATE TABLE IF NOT EXISTS catalog ('
+                'kind TEXT NOT NULL, identity TEXT NOT NULL, name TEXT, url TEXT, code_hash TEXT, creator TEXT, '
+                'file_name TEXT NOT NULL, mtime REAL, record TEXT, '
+                'PRIMARY KEY (kind, file_name))')
+
+            # catalogs created before the creator column was added
+            columns = [row[1] for row in self.__connection__.execute('PRAGMA table_info(catalog)')]
+            if 'creator' not in columns :
+                self.__connection__.execute('ALTER TABLE catalog ADD COLUMN creator TEXT')
+
+            self.__connection__.execute('CREATE INDEX IF NOT EXISTS catalog_name ON catalog (kind, name)')
+            self.__connection__.execute('CREATE INDEX IF NOT EXISTS catalog_identity ON catalog (kind, identity)')
+            self.__connection__.execute('CREATE INDEX IF NOT EXISTS catalog_code_hash ON catalog (kind, code_hash)')
+            self.__connection__.execute('CREATE INDEX IF NOT EXISTS catalog_creator ON catalog (kind, creator)')
+
+    # -----------------------------------------------------------------
+    def update(self, kind, file_name, identity, name, url=None, code_hash=None, creator=None, record=None) :
+        """add or replace the entry for a file, the record is an
+        optional serialization of the object small enough to rebuild
+        it without reading the file
+        """
+        try :
+            record = record.decode('utf-8')
+        except AttributeError :
+            pass
+
+        # entries without a name sort first and still page correctly
+        name = name or ''
+
+        try :
+            mtime = os.path.getmtime(file_name)
+        except OSError :
+            mtime = None
+
+        with self.__lock__, self.__connection__ :
+            self.__connection__.execute(
+                'INSERT OR REPLACE INTO catalog ({0}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)'.format(Catalog.__columns__),
+                (kind, identity, name, url, code_hash, creator, file_name, mtime, record))
+
+        logger.debug('catalog updated for %s', file_name)
+
+    # -----------------------------------------------------------------
+    def remove(self, kind, file_name) :
+        with self.__lock__, self.__connection__ :
+            self.__connection__.execute('DELETE FROM catalog WHERE kind = ? AND file_name = ?', (kind, file_name))
+
+    # -----------------------------------------------------------------
+    def clear(self, kind) :
+        with self.__lock__, self.__connection__ :
+            self.__connection__.execute('DELETE FROM catalog WHERE kind = ?', (kind,))
+
+    # -----------------------------------------------------------------
+    def reconcile(self, kind, directory, extension, index) :
+        """bring the entries of one kind in step with the files in a
+        directory; index(file_name) is called for each file added or
+        modified since it was indexed and must update its entry,
+        entries for files that are gone are removed
+        """
+        current = {}
+        try :
+            with os.scandir(directory) as entries :
+                for entry in entries :
+                    if entry.name.endswith(extension) and entry.is_file() :
+                        current[entry.path] = entry.stat().st_mtime
+        except FileNotFoundError :
+            pass
+
+        with self.__lock__ :
+            cursor = self.__connection__.execute('SELECT file_name, mtime FROM catalog WHERE kind = ?', (kind,))
+            indexed = dict(cursor.fetchall())
+
+        for file_name in indexed.keys() :
+            if file_name not in current :
+                logger.debug('file %s removed from the catalog', file_name)
+                self.remove(kind, file_name)
+
+        for (file_name, mtime) in current.items() :
+            if indexed.get(file_name) != mtime :
+                try :
+                    index(file_name)
+                except Exception as e :
+                    logger.warn('failed to index %s; %s', file_name, str(e))
+
+    # -----------------------------------------------------------------
+    def entries(self, kind) :
+        """return the entries of one kind ordered by name
+        """
+        with self.__lock__ :
+            cursor = self.__connection__.execute(
+                'SELECT {0} FROM catalog WHERE kind = ? ORDER BY name, file_name'.format(Catalog.__columns__),
+                (kind,))
+            return list(map(lambda row : CatalogEntry(*row), cursor.fetchall()))
+
+    # -----------------------------------------------------------------
+    def query(self, kind, name_prefix=None, creator=None, code_hash=None, cursor=None, limit=50) :
+        """return one page of entries ordered by name that match the
+        filters and the cursor for the following page, the cursor is
+        None on the last page
+        """
+        clauses = ['kind = ?']
+        parameters = [kind]
+
+        if name_prefix :
+            # a range on the name lets the query use the name index
+            clauses.append('name >= ? AND name < ?')
+            parameters.extend([name_prefix, name_prefix[:-1] + chr(ord(name_prefix[-1]) + 1)])
+        if creator :
+            clauses.append('creator = ?')
+            parameters.append(creator)
+        if code_hash :
+            clauses.append('code_hash = ?')
+            parameters.append(code_hash)
+        if cursor :
+            (last_name, last_file_name) = Catalog.decode_cursor(cursor)
+            clauses.append('(name > ? OR (name = ? AND file_name > ?))')
+            parameters.extend([last_name, last_name, last_file_name])
+
+        statement = 'SELECT {0} FROM catalog WHERE {1} ORDER BY name, file_name LIMIT ?'.format(
+            Catalog.__columns__, ' AND '.join(clauses))
+        parameters.append(limit + 1)
+
+        with self.__lock__ :
+            cursor = self.__connection__.execute(statement, parameters)
+            entries = list(map(lambda row : CatalogEntry(*row), cursor.fetchall()))
+
+        next_cursor = None
+        if len(entries) > limit :
+            entries = entries[:limit]
+            next_cursor = Catalog.encode_cursor(entries[-1])
+
+        return (entries, next_cursor)
+
+    # -----------------------------------------------------------------
+    @staticmethod
+    def encode_cursor(entry) :
+        position = json.dumps([entry.name, entry.file_name]).encode('utf-8')
+        return base64.urlsafe_b64encode(position).decode('ascii')
+
+    # -----------------------------------------------------------------
+    @staticmethod
+    def decode_cursor(cursor) :
+        """decode a cursor, raises ValueError if the cursor is malformed
+        """
+        try :
+            (name, file_name) = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        except Exception :
+            raise ValueError('invalid cursor')
+
+        return (name, file_name)
+
+    # -----------------------------------------------------------------
+    def entry(self, kind, file_name) :
+        """return the entry for a file or None if the file is not indexed
+        """
+        with self.__lock__ :
+            cursor = self.__connection__.execute(
+                'SELECT {0} FROM catalog WHERE kind = ? AND file_name = ?'.format(Catalog.__columns__),
+                (kind, file_name))
+            row = cursor.fetchone()
+
+        return CatalogEntry(*row) if row else None
+
+    # -----------------------------------------------------------------
+    def lookup(self, kind, identity) :
+        """return an entry with the identity or None if there is none
+        """
+        with self.__lock__ :
+            cursor = self.__connection__.execute(
+                'SELECT {0} FROM catalog WHERE kind = ? AND identity = ? LIMIT 1'.format(Catalog.__columns__),
+                (kind, identity))
+            row = cursor.fetchone()
+
+        return CatalogEntry(*row) if row else None
+
+    # -----------------------------------------------------------------
+    def count(self, kind) :
+        with self.__lock__ :
+            cursor = self.__connection__.execute('SELECT COUNT(*) FROM catalog WHERE kind = ?', (kind,))
+            return cursor.fetchone()[0]
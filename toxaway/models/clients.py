@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import functools
+import threading
+import time
+import urllib.parse
+
+from pdo.service_client.enclave import EnclaveServiceClient
+from pdo.service_client.provisioning import ProvisioningServiceClient
+
+import logging
+logger = logging.getLogger(__name__)
+
+__all__ = ['ServiceClientRegistry']
+
+# XXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXX
+# XXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXX
+class __PooledClient__(object) :
+    """A wrapper for a service client that holds a slot for the host
+    while a method of the client runs; failed is called when a method
+    raises
+    """
+
+    # -----------------------------------------------------------------
+    def __init__(self, client, host_slots, failed) :
+        self.__client__ = client
+        self.__host_slots__ = host_slots
+        self.__failed__ = failed
+
+    # -----------------------------------------------------------------
+    def __getattr__(self, attr) :
+        value = getattr(self.__client__, attr)
+        if not callable(value) :
+            return value
+
+        @functools.wraps(value)
+        def limited(*args, **kwargs) :
+            with self.__host_slots__ :
+                try :
+                    return value(*args, **kwargs)
+                except :
+                    self.__failed__(self)
+                    raise
+
+        return limited
+
+# XXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXX
+# XXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXX
+class ServiceClientRegistry(object) :
+    """A process-wide registry of enclave and provisioning service
+    clients keyed by service URL; clients are built once, shared by all
+    requests and dropped after they have been idle for ClientIdleTime
+    seconds or in use for ClientMaxAge seconds. A client captures the
+    identity and keys of the service when it is built, so a client is
+    also dropped when a request through it fails; the next request
+    builds a new one. The number of concurrent requests to each host is
+    limited to MaxConnectionsPerHost
+    """
+
+    __registry__ = None
+    __registry_lock__ = threading.Lock()
+
+    # -----------------------------------------------------------------
+    @classmethod
+    def open(cls, config) :
+        """return the registry, the configuration is used only when the
+        registry is first created
+        """
+        with ServiceClientRegistry.__registry_lock__ :
+            if ServiceClientRegistry.__registry__ is None :
+                ServiceClientRegistry.__registry__ = cls(config)
+
+        return ServiceClientRegistry.__registry__
+
+    # -----------------------------------------------------------------
+    def __init__(self, config) :
+        service_config = config.get('Service', {})
+        self.max_per_host = service_config.get('MaxConnectionsPerHost', 8)
+        self.idle_time = service_config.get('ClientIdleTime', 600)
+        self.max_age = service_config.get('ClientMaxAge', 3600)
+
+        self.__lock__ = threading.Lock()
+        self.__clients__ = {}
+        self.__hosts__ = {}
+
+        self.created = 0
+        self.reused = 0
+        self.evicted = 0
+        self.failed = 0
+
+    # -----------------------------------------------------------------
+    def eservice_client(self, service_url, fresh=False) :
+        """return the client for an enclave service, with fresh a new
+        client replaces any shared one
+        """
+        return self.__client__('eservice', service_url, EnclaveServiceClient, fresh)
+
+    # -----------------------------------------------------------------
+    def pservice_client(self, service_url, fresh=False) :
+        """return the client for a provisioning service, with fresh a new
+        client replaces any shared one
+        """
+        return self.__client__('pservice', service_url, ProvisioningServiceClient, fresh)
+
+    # -----------------------------------------------------------------
+    def statistics(self) :
+        with self.__lock__ :
+            return {
+                'clients' : len(self.__clients__),
+                'hosts' : len(self.__hosts__),
+                'created' : self.created,
+                'reused' : self.reused,
+                'evicted' : self.evicted,
+                'failed' : self.failed,
+            }
+
+    # -----------------------------------------------------------------
+    def __client__(self, kind, service_url, factory, fresh=False) :
+        key = (kind, service_url)
+        now = time.time()
+
+        with self.__lock__ :
+            self.__evict__(now)
+            entry = self.__clients__.get(key)
+            if entry is not None and not fresh :
+                self.__clients__[key] = (entry[0], entry[1], now)
+                self.reused += 1
+                return entry[0]
+
+            host = urllib.parse.urlsplit(service_url).netloc
+            slots = self.__hosts__.get(host)
+            if slots is None :
+                slots = threading.BoundedSemaphore(self.max_per_host)
+                self.__hosts__[host] = slots
+
+        # building a client may contact the service, do it outside the lock
+        logger.debug('create %s client for %s', kind, service_url)
+        client = __PooledClient__(factory(service_url), slots, lambda c : self.__failed__(key, c))
+
+        with self.__lock__ :
+            entry = self.__clients__.get(key)
+            if entry is not None and not fresh :
+                self.reused += 1
+                return entry[0]
+
+            self.__clients__[key] = (client, now, now)
+            self.created += 1
+
+        return client
+
+    # -----------------------------------------------------------------
+    def __failed__(self, key, client) :
+        """drop a client after a failed request unless it was replaced
+        """
+        with self.__lock__ :
+            entry = self.__clients__.get(key)
+            if entry is not None and entry[0] is client :
+                logger.debug('drop %s client for %s after a failure', key[0], key[1])
+                del self.__clients__[key]
+                self.failed += 1
+
+    # -----------------------------------------------------------------
+    def __evict__(self, now) :
+        expired = [k for (k, (c, created, used)) in self.__clients__.items()
+                   if now - used > self.idle_time or now - created > self.max_age]
+        for key in expired :
+            logger.debug('drop expired %s client for %s', key[0], key[1])
+            del self.__clients__[key]
+            self.evicted += 1
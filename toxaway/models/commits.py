@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import concurrent.futures
+import threading
+import time
+
+import logging
+logger = logging.getLogger(__name__)
+
+__all__ = ['CommitManager', 'CommitQueueFullException']
+
+# XXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXX
+# XXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXX
+class CommitQueueFullException(Exception) :
+    pass
+
+# XXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXX
+# XXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXX
+class CommitManager(object) :
+    """A process-wide record of the state commits submitted to the
+    ledger; the number of commits that have not completed, together with
+    the updates that have reserved room for a commit, is capped. New
+    updates wait for room (up to CommitWaitTime seconds) and are then
+    rejected
+    """
+
+    __manager__ = None
+    __manager_lock__ = threading.Lock()
+
+    # -----------------------------------------------------------------
+    @classmethod
+    def open(cls, config) :
+        with CommitManager.__manager_lock__ :
+            if CommitManager.__manager__ is None :
+                CommitManager.__manager__ = cls(config)
+
+        return CommitManager.__manager__
+
+    # -----------------------------------------------------------------
+    @classmethod
+    def shutdown(cls) :
+        with CommitManager.__manager_lock__ :
+            manager = CommitManager.__manager__
+            CommitManager.__manager__ = None
+
+        if manager is not None :
+            pending = manager.statistics()['pending']
+            if pending :
+                logger.warn('shutdown with %d commits pending', pending)
+            manager.__executor__.shutdown(wait=False)
+
+    # -----------------------------------------------------------------
+    def __init__(self, config) :
+        ledger_config = config.get('Sawtooth', {})
+        self.ledger_config = ledger_config
+        self.max_pending = ledger_config.get('MaxPendingCommits', 256)
+        self.wait_time = ledger_config.get('CommitWaitTime', 0)
+
+        self.__condition__ = threading.Condition()
+        self.__pending__ = {}
+        self.__reserved__ = 0
+        self.__sequence__ = 0
+        self.__executor__ = concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.max_pending, thread_name_prefix='commit')
+
+        self.submitted = 0
+        self.committed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.commit_time = 0.0
+
+    # -----------------------------------------------------------------
+    @property
+    def depth(self) :
+        with self.__condition__ :
+            return len(self.__pending__) + self.__reserved__
+
+    # -----------------------------------------------------------------
+    def admit(self) :
+        """wait for room for one more commit and reserve it, raises
+        CommitQueueFullException if there is none; call when an update
+        changes the state, before the new state is kept, so a rejected
+        update leaves no state behind. the reservation is taken up by
+        submit or returned with release
+        """
+        with self.__condition__ :
+            deadline = time.time() + self.wait_time
+            while len(self.__pending__) + self.__reserved__ >= self.max_pending :
+                remaining = deadline - time.time()
+                if remaining <= 0 :
+                    self.rejected += 1
+                    raise CommitQueueFullException('too many pending commits')
+                self.__condition__.wait(remaining)
+            self.__reserved__ += 1
+
+    # -----------------------------------------------------------------
+    def release(self) :
+        """return a reservation that will not be submitted
+        """
+        with self.__condition__ :
+            self.__reserved__ -= 1
+            self.__condition__.notify_all()
+
+    # -----------------------------------------------------------------
+    def submit(self, contract_id, update_response, rejected=None) :
+        """start the commit of an update and track it until the ledger
+        accepts or rejects the transaction; the update must have been
+        admitted. rejected is called if the commit fails
+        """
+        with self.__condition__ :
+            self.__reserved__ -= 1
+            self.__sequence__ += 1
+            commit_key = self.__sequence__
+            self.__pending__[commit_key] = (contract_id, time.time(), rejected)
+            self.submitted += 1
+
+        try :
+            update_response.commit_asynchronously(self.ledger_config)
+        except :
+            self.__complete__(commit_key, None)
+            raise
+
+        self.__executor__.submit(self.__watch__, commit_key, update_response)
+
+    # -----------------------------------------------------------------
+    def statistics(self) :
+        now = time.time()
+        with self.__condition__ :
+            contracts = {}
+            oldest = None
+            for (contract_id, submitted, rejected) in self.__pending__.values() :
+                contracts[contract_id] = contracts.get(contract_id, 0) + 1
+                oldest = submitted if oldest is None else min(oldest, submitted)
+
+            completed = self.committed + self.failed
+            return {
+                'pending' : len(self.__pending__),
+                'reserved' : self.__reserved__,
+                'limit' : self.max_pending,
+                'oldest_age' : None if oldest is None else now - oldest,
+                'contracts' : contracts,
+                'submitted' : self.submitted,
+                'committed' : self.committed,
+                'failed' : self.failed,
+                'rejected' : self.rejected,
+                'average_commit_time' : self.commit_time / completed if completed else None,
+            }
+
+    # -----------------------------------------------------------------
+    def __watch__(self, commit_key, update_response) :
+        try :
+            txn_id = update_response.wait_for_commit()
+        except Exception as e :
+            logger.warn('commit failed; %s', str(e))
+            txn_id = None
+
+        self.__complete__(commit_key, txn_id)
+
+    # -----------------------------------------------------------------
+    def __complete__(self, commit_key, txn_id) :
+        with self.__condition__ :
+            (contract_id, submitted, rejected) = self.__pending__.pop(commit_key)
+            self.commit_time += time.time() - submitted
+            if txn_id is None :
+                logger.warn('failed to commit update for contract %s', contract_id)
+                self.failed += 1
+            else :
+                self.committed += 1
+            self.__condition__.notify_all()
+
+        if txn_id is None and rejected is not None :
+            try :
+                rejected()
+            except Exception as e :
+                logger.warn('failed to reset contract %s after a failed commit; %s', contract_id, str(e))
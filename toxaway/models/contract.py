@@ -17,11 +17,17 @@ import glob
 import hashlib
 import json
 import os
+import threading
 
 from pdo.contract.state import ContractState as pdo_contract_state
 from pdo.contract.code import ContractCode as pdo_contract_code
 from pdo.contract.contract import Contract as pdo_contract
-from sawtooth.helpers import pdo_connect
+
+from toxaway.models.cache import LRUCache
+from toxaway.models.catalog import Catalog
+from toxaway.models.ledger import LedgerClient
+from toxaway.models.sequencer import ContractSequencer
+from toxaway.models.state import StateCache
 
 import logging
 logger = logging.getLogger(__name__)
@@ -29,7 +35,9 @@ logger = logging.getLogger(__name__)
 # XXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXX
 # XXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXX
 class ContractList(object) :
-    """A class to store information about contract code files
+    """A class to store information about contract code files; the
+    list holds contract summaries, full contracts are loaded from the
+    summary on demand
     """
 
     # -----------------------------------------------------------------
@@ -37,16 +45,33 @@ class ContractList(object) :
     def load(cls, config) :
         """Compute a list of URLs for known contracts
         """
-        root = Contract.__root_directory__(config)
-        contract_files = glob.glob('{0}/*.pdo'.format(root))
-
         contract_list = cls(config)
-        for contract_file in contract_files :
-            contract = Contract.load(config, contract_file, use_raw=True)
-            contract_list.add(contract)
+        for summary in ContractRegistry.open(config).summaries() :
+            contract_list.add(summary)
 
         return contract_list
 
+    # -----------------------------------------------------------------
+    @classmethod
+    def load_page(cls, config, name_prefix=None, creator=None, code_hash=None, cursor=None, limit=50) :
+        """Compute one page of contract summaries from the catalog, returns the
+        list and the cursor for the next page; the registry scan brings
+        the catalog up to date with contract files that were added,
+        changed or removed without going through Contract.save
+        """
+        ContractRegistry.open(config).refresh()
+
+        catalog = Catalog.open(config)
+        (entries, next_cursor) = catalog.query(
+            Contract.__catalog_kind__, name_prefix=name_prefix, creator=creator, code_hash=code_hash,
+            cursor=cursor, limit=limit)
+
+        contract_list = cls(config)
+        for entry in entries :
+            contract_list.add(ContractSummary.from_catalog_entry(entry))
+
+        return (contract_list, next_cursor)
+
     # -----------------------------------------------------------------
     def __init__(self, config) :
         self.config = config
@@ -77,11 +102,126 @@ class ContractList(object) :
     def count(self) :
         return len(self.__by_contract_id__)
 
+# XXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXX
+# XXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXX
+class ContractSummary(object) :
+    """A class to store the listing information for a contract without
+    the contract code or state
+    """
+
+    # -----------------------------------------------------------------
+    @classmethod
+    def from_contract(cls, contract, file_name) :
+        summary = cls()
+        summary.file_name = file_name
+        summary.contract_id = contract.contract_id
+        summary.creator_id = contract.creator_id
+        summary.name = contract.name
+        summary.code_name = contract.code.name
+        summary.code_hash = contract.code_hash
+        summary.enclaves = list(contract.provisioned_enclaves)
+        summary.invoke_enclave = contract.invoke_enclave
+        summary.update_enclave = contract.update_enclave
+        return summary
+
+    # -----------------------------------------------------------------
+    @classmethod
+    def from_contract_file(cls, file_name) :
+        """build the summary from the contract file without retrieving
+        the contract state
+        """
+        with open(file_name, "r") as contract_file :
+            contract_info = json.load(contract_file)
+
+        code_info = contract_info['contract_code']
+        extra_data = contract_info.get('extra_data', {})
+
+        summary = cls()
+        summary.file_name = file_name
+        summary.contract_id = contract_info['contract_id']
+        summary.creator_id = contract_info['creator_id']
+        summary.name = extra_data.get('name', hashlib.sha256(summary.contract_id.encode()).hexdigest()[:16])
+        summary.code_name = code_info['Name']
+        summary.code_hash = hashlib.sha256(code_info['Code'].encode('utf8')).hexdigest()[:16]
+        summary.enclaves = list(map(lambda e : e['contract_enclave_id'], contract_info['enclaves_info']))
+        summary.invoke_enclave = extra_data.get('invoke-enclave', 'random')
+        summary.update_enclave = extra_data.get('update-enclave', 'random')
+        return summary
+
+    # -----------------------------------------------------------------
+    @classmethod
+    def from_catalog_entry(cls, entry) :
+        # older catalog entries do not carry a summary record
+        if not entry.record :
+            return cls.from_contract_file(entry.file_name)
+
+        summary = cls(entry.record)
+        summary.file_name = entry.file_name
+        return summary
+
+    # -----------------------------------------------------------------
+    def __init__(self, serialized = None) :
+        self.file_name = None
+        if serialized :
+            self.deserialize(serialized)
+
+    # -----------------------------------------------------------------
+    @property
+    def safe_contract_id(self) :
+        return self.contract_id.replace('+','-').replace('/','_')
+
+    # -----------------------------------------------------------------
+    def load_contract(self, config) :
+        """load the full contract described by the summary
+        """
+        return Contract.load(config, self.file_name, use_raw=True)
+
+    # -----------------------------------------------------------------
+    def update_catalog(self, config) :
+        catalog = Catalog.open(config)
+        catalog.update(Contract.__catalog_kind__, self.file_name, self.contract_id, self.name,
+                       code_hash=self.code_hash, creator=self.creator_id, record=self.serialize())
+
+    # -----------------------------------------------------------------
+    def deserialize(self, serialized) :
+        try :
+            serialized = serialized.decode('utf-8')
+        except AttributeError :
+            pass
+
+        summary_info = json.loads(serialized)
+
+        self.contract_id = summary_info['contract_id']
+        self.creator_id = summary_info['creator_id']
+        self.name = summary_info['name']
+        self.code_name = summary_info['code_name']
+        self.code_hash = summary_info['code_hash']
+        self.enclaves = summary_info['enclaves']
+        self.invoke_enclave = summary_info['invoke_enclave']
+        self.update_enclave = summary_info['update_enclave']
+
+    # -----------------------------------------------------------------
+    def serialize(self) :
+        serialized = dict()
+        serialized['contract_id'] = self.contract_id
+        serialized['creator_id'] = self.creator_id
+        serialized['name'] = self.name
+        serialized['code_name'] = self.code_name
+        serialized['code_hash'] = self.code_hash
+        serialized['enclaves'] = self.enclaves
+        serialized['invoke_enclave'] = self.invoke_enclave
+        serialized['update_enclave'] = self.update_enclave
+
+        return json.dumps(serialized).encode('utf-8')
+
 # XXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXX
 # XXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXX
 class Contract(pdo_contract) :
     """A class to store information about an enclave service
     """
+
+    __catalog_kind__ = 'contract'
+
     # -----------------------------------------------------------------
     @staticmethod
     def __root_directory__(config) :
@@ -125,22 +265,9 @@ class Contract(pdo_contract) :
         ## need to handle the case where the contract has been registered
         ## but the initial state has not been committed
 
-        ledger_config = config.get('Sawtooth', {})
         try :
             contract_id = contract_info['contract_id']
-            current_state_hash = pdo_contract_state.get_current_state_hash(ledger_config, contract_id)
-        except Exception as e :
-            logger.error('error occurred retreiving contract state hash; %s', str(e))
-            raise Exception('invalid contract file; {}'.format(contract_name))
-
-        try :
-            path_config = config.get('ContentPaths')
-            state_root = os.path.realpath(path_config.get('State', os.path.join(os.environ['HOME'], '.toxaway')))
-
-            state = pdo_contract_state.read_from_cache(contract_id, current_state_hash, data_dir=state_root)
-            if state is None :
-                state = pdo_contract_state.get_from_ledger(ledger_config, contract_id, current_state_hash)
-                state.save_to_cache(data_dir=data_dir)
+            state = Contract.__current_state__(config, contract_id)
         except Exception as e :
             logger.error('error occurred retreiving contract state; %s', str(e))
             raise Exception("invalid contract file; {}".format(contract_name))
@@ -159,6 +286,46 @@ class Contract(pdo_contract) :
         obj.save(config)
         return obj
 
+    # -----------------------------------------------------------------
+    @classmethod
+    def from_pdo_contract(cls, config, contract, contract_name) :
+        """create a contract from a pdo contract that is already in
+        memory, such as one that was just created, and save it; the
+        state is taken from the pdo contract rather than the ledger
+        """
+        extra_data = dict(getattr(contract, 'extra_data', None) or {})
+        extra_data['name'] = contract_name
+        extra_data['update-enclave'] = 'random'
+        extra_data['invoke-enclave'] = 'random'
+
+        obj = cls(contract.code, contract.contract_state, contract.contract_id, contract.creator_id, extra_data=extra_data)
+        for (enclave_id, encrypted_key) in contract.enclave_map.items() :
+            obj.set_state_encryption_key(enclave_id, encrypted_key)
+
+        obj.save(config)
+        return obj
+
+    # -----------------------------------------------------------------
+    @classmethod
+    def rebuild_catalog(cls, config) :
+        """scan the content directory and regenerate the catalog
+        entries for contracts
+        """
+        root = Contract.__root_directory__(config)
+        contract_files = glob.glob('{0}/*.pdo'.format(root))
+
+        catalog = Catalog.open(config)
+        catalog.clear(Contract.__catalog_kind__)
+        for contract_file in contract_files :
+            try :
+                summary = ContractSummary.from_contract_file(contract_file)
+            except Exception as e :
+                logger.warn('failed to read contract from %s; %s', contract_file, str(e))
+                continue
+            summary.update_catalog(config)
+
+        return catalog.entries(Contract.__catalog_kind__)
+
     # -----------------------------------------------------------------
     @classmethod
     def load(cls, config, code_file_name, use_raw=False) :
@@ -166,14 +333,61 @@ class Contract(pdo_contract) :
         """
         if not use_raw :
             code_file_name = Contract.__file_name__(config, code_file_name)
+
+        return ContractRegistry.open(config).get(code_file_name)
+
+    # -----------------------------------------------------------------
+    @classmethod
+    def read_from_disk(cls, config, code_file_name, state_hash=None) :
+        """read and parse a contract file, bypassing the registry; the
+        state is the current state on the ledger unless the hash of the
+        state is provided
+        """
         if not os.path.exists(code_file_name) :
             return None
 
-        path_config = config.get('ContentPaths')
-        state_root = os.path.realpath(path_config.get('State', os.path.join(os.environ['HOME'], '.toxaway')))
-
         logger.info('load from %s', code_file_name)
-        return cls.read_from_file(config['Sawtooth'], code_file_name, data_dir=state_root)
+        with open(code_file_name, "r") as contract_file :
+            contract_info = json.load(contract_file)
+
+        code_info = contract_info['contract_code']
+        code = pdo_contract_code(code_info['Code'], code_info['Name'], code_info['Nonce'])
+
+        contract_id = contract_info['contract_id']
+        state = Contract.__current_state__(config, contract_id, state_hash)
+
+        extra_data = contract_info.get('extra_data', {})
+        obj = cls(code, state, contract_id, contract_info['creator_id'], extra_data=extra_data)
+        for enclave in contract_info['enclaves_info'] :
+            obj.set_state_encryption_key(
+                enclave['contract_enclave_id'],
+                enclave['encrypted_contract_state_encryption_key'])
+
+        return obj
+
+    # -----------------------------------------------------------------
+    @staticmethod
+    def __current_state_hash__(config, contract_id) :
+        ledger_config = config.get('Sawtooth', {})
+        return pdo_contract_state.get_current_state_hash(ledger_config, contract_id)
+
+    # -----------------------------------------------------------------
+    @staticmethod
+    def __current_state__(config, contract_id, current_state_hash=None) :
+        """retrieve the current state of the contract from memory, the
+        State directory or, failing both, the ledger
+        """
+        ledger_config = config.get('Sawtooth', {})
+        if current_state_hash is None :
+            current_state_hash = Contract.__current_state_hash__(config, contract_id)
+
+        state_cache = StateCache.open(config)
+        state = state_cache.read(contract_id, current_state_hash)
+        if state is None :
+            state = pdo_contract_state.get_from_ledger(ledger_config, contract_id, current_state_hash)
+            state_cache.save(state)
+
+        return state
 
     # -----------------------------------------------------------------
     def __init__(self, code, state, contract_id, creator_id, **kwargs) :
@@ -184,6 +398,14 @@ class Contract(pdo_contract) :
     def safe_contract_id(self) :
         return self.contract_id.replace('+','-').replace('/','_')
 
+    # -----------------------------------------------------------------
+    @property
+    def code_hash(self) :
+        """hash of the contract source, matches the hash used to store
+        the corresponding contract code object
+        """
+        return hashlib.sha256(self.code.code.encode('utf8')).hexdigest()[:16]
+
     # -----------------------------------------------------------------
     @property
     def name(self) :
@@ -245,6 +467,204 @@ class Contract(pdo_contract) :
             os.makedirs(code_path)
 
         self.save_to_file(code_file_name)
+        self.__update_catalog__(config, code_file_name)
+        ContractRegistry.open(config).put(code_file_name, self)
+        ContractSequencer.open(config).saved(self)
+
+    # -----------------------------------------------------------------
+    def __update_catalog__(self, config, code_file_name) :
+        ContractSummary.from_contract(self, code_file_name).update_catalog(config)
+
+# XXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXX
+# XXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXX
+class ContractRegistry(object) :
+    """A process-wide registry of contracts; files are re-stated on each
+    access so only contracts that were added, changed or removed are
+    read again. The state of a contract lives on the ledger rather than
+    in the file, so the state hash of a parsed contract is checked
+    against the ledger on each access as well. Summaries are kept for
+    every contract, the parsed contracts are held within a memory budget
+    and the least recently used are dropped first
+    """
+
+    __registries__ = {}
+    __registries_lock__ = threading.Lock()
+
+    # -----------------------------------------------------------------
+    @classmethod
+    def open(cls, config) :
+        root = Contract.__root_directory__(config)
+        with ContractRegistry.__registries_lock__ :
+            registry = ContractRegistry.__registries__.get(root)
+            if registry is None :
+                registry = cls(config)
+                ContractRegistry.__registries__[root] = registry
+
+        return registry
+
+    # -----------------------------------------------------------------
+    @staticmethod
+    def __file_stamp__(file_name) :
+        try :
+            stat = os.stat(file_name)
+        except FileNotFoundError :
+            return None
+
+        return (stat.st_mtime_ns, stat.st_size)
+
+    # -----------------------------------------------------------------
+    @staticmethod
+    def __contract_size__(file_stamp, contract) :
+        """estimate the memory held by a contract from the size of its
+        file and its encrypted state
+        """
+        state = getattr(contract.contract_state, 'encrypted_state', None) or ''
+        return file_stamp[1] + len(state)
+
+    # -----------------------------------------------------------------
+    def __init__(self, config) :
+        cache_config = config.get('Cache', {})
+        self.config = config
+        self.root = Contract.__root_directory__(config)
+
+        self.__lock__ = threading.Lock()
+        self.__scanned__ = False
+        self.__stamps__ = {}
+        self.__summaries__ = {}
+        self.__contracts__ = LRUCache(max_bytes=cache_config.get('ContractCacheBytes', 64 * 1024 * 1024))
+
+    # -----------------------------------------------------------------
+    def refresh(self) :
+        """re-stat the contract directory, forget contracts whose files
+        changed or disappeared and read summaries for the rest; the
+        catalog is kept in step with the directory
+        """
+        current = {}
+        try :
+            with os.scandir(self.root) as entries :
+                for entry in entries :
+                    if entry.name.endswith('.pdo') and entry.is_file() :
+                        stat = entry.stat()
+                        current[entry.path] = (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError :
+            pass
+
+        catalog = Catalog.open(self.config)
+        with self.__lock__ :
+            # the first scan in the process also drops catalog entries
+            # for files removed while the process was not running
+            if not self.__scanned__ :
+                self.__scanned__ = True
+                for entry in catalog.entries(Contract.__catalog_kind__) :
+                    if entry.file_name not in current :
+                        catalog.remove(Contract.__catalog_kind__, entry.file_name)
+
+            for file_name in list(self.__stamps__.keys()) :
+                if current.get(file_name) != self.__stamps__[file_name] :
+                    logger.debug('contract file %s changed', file_name)
+                    self.__forget__(file_name)
+                    if file_name not in current :
+                        catalog.remove(Contract.__catalog_kind__, file_name)
+            added = [f for f in current.keys() if f not in self.__stamps__]
+
+        for file_name in added :
+            try :
+                summary = self.__read_summary__(file_name)
+            except Exception as e :
+                logger.warn('failed to read contract summary from %s; %s', file_name, str(e))
+                continue
+
+            with self.__lock__ :
+                self.__stamps__[file_name] = current[file_name]
+                self.__summaries__[file_name] = summary
+
+    # -----------------------------------------------------------------
+    def get(self, file_name) :
+        """return the parsed contract stored in a file with the current
+        state from the ledger, the file is read only when it is not in
+        memory, has changed on disk or the state has been updated since
+        the contract was read
+        """
+        file_stamp = ContractRegistry.__file_stamp__(file_name)
+        if file_stamp is None :
+            with self.__lock__ :
+                self.__forget__(file_name)
+            return None
+
+        current_state_hash = None
+        cached = self.__contracts__.get(file_name, validate=lambda entry : entry[0] == file_stamp)
+        if cached is not None :
+            contract = cached[1]
+            current_state_hash = Contract.__current_state_hash__(self.config, contract.contract_id)
+            if StateCache.state_hash(contract.contract_state) == current_state_hash :
+                return contract
+            logger.debug('state of contract %s changed on the ledger', contract.contract_id)
+
+        contract = Contract.read_from_disk(self.config, file_name, current_state_hash)
+        if contract is not None :
+            self.__remember__(file_name, file_stamp, contract)
+
+        return contract
+
+    # -----------------------------------------------------------------
+    def remove(self, file_name) :
+        """drop the parsed contract so the next access reads it again
+        """
+        self.__contracts__.remove(file_name)
+
+    # -----------------------------------------------------------------
+    def put(self, file_name, contract) :
+        """record a contract that was just written to disk
+        """
+        file_stamp = ContractRegistry.__file_stamp__(file_name)
+        if file_stamp is not None :
+            self.__remember__(file_name, file_stamp, contract)
+
+    # -----------------------------------------------------------------
+    def summaries(self) :
+        """return summaries for every contract ordered by name
+        """
+        self.refresh()
+        with self.__lock__ :
+            summaries = list(self.__summaries__.values())
+
+        return sorted(summaries, key=lambda s : (s.name, s.file_name))
+
+    # -----------------------------------------------------------------
+    def statistics(self) :
+        statistics = self.__contracts__.statistics()
+        with self.__lock__ :
+            statistics['files'] = len(self.__stamps__)
+            statistics['summaries'] = len(self.__summaries__)
+        return statistics
+
+    # -----------------------------------------------------------------
+    def __read_summary__(self, file_name) :
+        """use the catalog entry for the file when it is current,
+        otherwise parse the contract file and update the catalog
+        """
+        entry = Catalog.open(self.config).entry(Contract.__catalog_kind__, file_name)
+        if entry is not None and entry.record and entry.mtime == os.path.getmtime(file_name) :
+            return ContractSummary.from_catalog_entry(entry)
+
+        summary = ContractSummary.from_contract_file(file_name)
+        summary.update_catalog(self.config)
+        return summary
+
+    # -----------------------------------------------------------------
+    def __remember__(self, file_name, file_stamp, contract) :
+        size = ContractRegistry.__contract_size__(file_stamp, contract)
+        summary = ContractSummary.from_contract(contract, file_name)
+        with self.__lock__ :
+            self.__stamps__[file_name] = file_stamp
+            self.__summaries__[file_name] = summary
+            self.__contracts__.put(file_name, (file_stamp, contract), size)
+
+    # -----------------------------------------------------------------
+    def __forget__(self, file_name) :
+        self.__stamps__.pop(file_name, None)
+        self.__summaries__.pop(file_name, None)
+        self.__contracts__.remove(file_name)
 
 # XXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXX
 # XXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXX
@@ -258,18 +678,22 @@ class LedgerContract(object) :
         """Compute a list of URLs for known contracts
         """
 
-        ledger_config = config["Sawtooth"]
-        client = pdo_connect.PdoRegistryHelper(ledger_config['LedgerURL'])
+        client = LedgerClient.open(config)
+
+        # the contract registration and the current state are independent,
+        # look them up together; the state itself depends on the hash
+        contract_future = client.submit(client.contract_info, contract_id)
+        ccl_future = client.submit(client.ccl_info, contract_id)
 
         try :
-            contract_info = client.get_contract_dict(contract_id)
+            contract_info = contract_future.result()
         except Exception as e :
             logger.info('error getting state hash; %s', str(e))
             raise Exception('failed to retrieve contract state hash; {}'.format(contract_id))
         logger.info("contract_info: %s", contract_info)
 
         try :
-            ccl_info = client.get_ccl_info_dict(contract_id)
+            ccl_info = ccl_future.result()
             current_state_hash = ccl_info['current_state']['state_hash']
         except Exception as e :
             logger.info('error getting state hash; %s', str(e))
@@ -277,7 +701,7 @@ class LedgerContract(object) :
         logger.info("ccl_info: %s", ccl_info)
 
         try :
-            state_info = client.get_ccl_state_dict(contract_id, current_state_hash)
+            state_info = client.state_info(contract_id, current_state_hash)
         except Exception as e :
             logger.info('error getting state; %s', str(e))
             raise Exception('failed to retrieve contract state; {}', contract_id)
@@ -17,9 +17,14 @@ import glob
 import hashlib
 import json
 import os
+import tempfile
+import threading
 
 from pdo.contract import ContractCode as pdo_contract_code
 
+from toxaway.models.cache import LRUCache
+from toxaway.models.catalog import Catalog
+
 import logging
 logger = logging.getLogger(__name__)
 
@@ -34,16 +39,33 @@ class ContractCodeList(object) :
     def load(cls, config) :
         """Compute a list of URLs for known contracts
         """
-        root = ContractCode.__root_directory__(config)
-        ccode_files = glob.glob('{0}/*.json'.format(root))
+        ContractCode.refresh_catalog(config)
+        entries = Catalog.open(config).entries(ContractCode.__catalog_kind__)
 
         ccode_list = cls(config)
-        for ccode_file in ccode_files :
-            ccode = ContractCode.load(config, ccode_file, use_raw=True)
-            ccode_list.add(ccode)
+        for entry in entries :
+            ccode_list.add(ContractCode.from_catalog_entry(entry))
 
         return ccode_list
 
+    # -----------------------------------------------------------------
+    @classmethod
+    def load_page(cls, config, name_prefix=None, code_hash=None, cursor=None, limit=50) :
+        """Compute one page of contract code from the catalog, returns the
+        list and the cursor for the next page
+        """
+        ContractCode.refresh_catalog(config)
+        catalog = Catalog.open(config)
+
+        (entries, next_cursor) = catalog.query(
+            ContractCode.__catalog_kind__, name_prefix=name_prefix, code_hash=code_hash, cursor=cursor, limit=limit)
+
+        ccode_list = cls(config)
+        for entry in entries :
+            ccode_list.add(ContractCode.from_catalog_entry(entry))
+
+        return (ccode_list, next_cursor)
+
     # -----------------------------------------------------------------
     def __init__(self, config) :
         self.config = config
@@ -87,6 +109,35 @@ class ContractCodeList(object) :
 class ContractCode(object) :
     """A class to store information about an enclave service
     """
+
+    __catalog_kind__ = 'contract_code'
+
+    __cache__ = None
+    __cache_lock__ = threading.Lock()
+
+    __chunk_size__ = 64 * 1024
+
+    # -----------------------------------------------------------------
+    @staticmethod
+    def __code_cache__(config=None) :
+        """return the process-wide cache of contract source and pdo code
+        objects; the budget is taken from the configuration used to
+        create the cache, later configurations are ignored
+        """
+        with ContractCode.__cache_lock__ :
+            if ContractCode.__cache__ is None :
+                cache_config = config.get('Cache', {}) if config is not None else {}
+                ContractCode.__cache__ = LRUCache(max_bytes=cache_config.get('CodeCacheBytes', 16 * 1024 * 1024))
+
+        return ContractCode.__cache__
+
+    # -----------------------------------------------------------------
+    @staticmethod
+    def cache_statistics() :
+        if ContractCode.__cache__ is None :
+            return {}
+        return ContractCode.__cache__.statistics()
+
     # -----------------------------------------------------------------
     @staticmethod
     def __root_directory__(config) :
@@ -115,36 +166,96 @@ class ContractCode(object) :
     # -----------------------------------------------------------------
     @classmethod
     def create(cls, config, code_file, code_name) :
-        """create a new contract code object and save it
+        """create a new contract code object and save it; the code is
+        streamed to a temporary file while it is hashed and then moved
+        to a location named by the hash, code that is already stored is
+        not written again
         """
 
-        try :
-            code_data = code_file.read()
-        except :
-            logger.warn('failed to retrieve ccode information')
-            return None
-
-        ccode_object = cls()
-        ccode_object.name = code_name
-        ccode_object.code_hash = hashlib.sha256(code_data).hexdigest()[:16]
-        ccode_object.data_file_name = ContractCode.__data_file_name__(config, ccode_object.code_hash)
-
-        code_path = os.path.dirname(ccode_object.data_file_name)
+        code_path = ContractCode.__root_directory__(config)
         if not os.path.isdir(code_path) :
             os.makedirs(code_path)
 
-        with open(ccode_object.data_file_name, "wb") as df :
-            df.write(code_data)
+        code_hasher = hashlib.sha256()
+        with tempfile.NamedTemporaryFile(dir=code_path, prefix='.upload-', delete=False) as tf :
+            temp_file_name = tf.name
+            try :
+                while True :
+                    chunk = code_file.read(ContractCode.__chunk_size__)
+                    if not chunk :
+                        break
+                    if isinstance(chunk, str) :
+                        chunk = chunk.encode('utf-8')
+                    code_hasher.update(chunk)
+                    tf.write(chunk)
+            except :
+                logger.warn('failed to retrieve ccode information')
+                tf.close()
+                os.remove(temp_file_name)
+                return None
+
+        code_hash = code_hasher.hexdigest()[:16]
+        data_file_name = ContractCode.__data_file_name__(config, code_hash)
+        if os.path.exists(data_file_name) :
+            logger.info('contract code %s already stored', code_hash)
+            os.remove(temp_file_name)
+        else :
+            os.replace(temp_file_name, data_file_name)
+
+        existing = cls.load(config, code_hash)
+        if existing is not None and existing.name == code_name :
+            logger.info('contract code %s already registered as %s', code_hash, code_name)
+            return existing
 
+        ccode_object = cls()
+        ccode_object.name = code_name
+        ccode_object.code_hash = code_hash
+        ccode_object.data_file_name = data_file_name
         ccode_object.save(config)
 
         return ccode_object
 
+    # -----------------------------------------------------------------
+    @classmethod
+    def from_catalog_entry(cls, entry) :
+        return cls(entry.record)
+
+    # -----------------------------------------------------------------
+    @classmethod
+    def rebuild_catalog(cls, config) :
+        """scan the content directory and regenerate the catalog
+        entries for contract code
+        """
+        root = ContractCode.__root_directory__(config)
+        ccode_files = glob.glob('{0}/*.json'.format(root))
+
+        catalog = Catalog.open(config)
+        catalog.clear(ContractCode.__catalog_kind__)
+        for ccode_file in ccode_files :
+            ccode = cls.load(config, ccode_file, use_raw=True)
+            ccode.__update_catalog__(config, ccode_file)
+
+        return catalog.entries(ContractCode.__catalog_kind__)
+
+    # -----------------------------------------------------------------
+    @classmethod
+    def refresh_catalog(cls, config) :
+        """index the contract code files added or modified since the catalog
+        was last updated and drop the entries for files that were removed
+        """
+        def index(ccode_file) :
+            ccode = cls.load(config, ccode_file, use_raw=True)
+            ccode.__update_catalog__(config, ccode_file)
+
+        root = ContractCode.__root_directory__(config)
+        Catalog.open(config).reconcile(ContractCode.__catalog_kind__, root, '.json', index)
+
     # -----------------------------------------------------------------
     @classmethod
     def load(cls, config, code_file_name, use_raw=False) :
         """load an existing ccode from disk
         """
+        ContractCode.__code_cache__(config)
         if not use_raw :
             code_file_name = ContractCode.__file_name__(config, code_file_name)
         if not os.path.exists(code_file_name) :
@@ -166,18 +277,34 @@ class ContractCode(object) :
             self.data_file_name = None
 
     # -----------------------------------------------------------------
-    def create_pdo_contract(self) :
-        return pdo_contract_code(self.code, self.name)
+    def create_pdo_contract(self, config=None) :
+        """return the pdo code object for the contract code, objects are
+        shared by all contracts created from the same code
+        """
+        cache = ContractCode.__code_cache__(config)
+        cache_key = ('pdo', self.code_hash, self.name)
+        pdo_code_object = cache.get(cache_key)
+        if pdo_code_object is None :
+            code = self.code
+            pdo_code_object = pdo_contract_code(code, self.name)
+            cache.put(cache_key, pdo_code_object, len(code))
+
+        return pdo_code_object
 
     # -----------------------------------------------------------------
     @property
     def code(self) :
         if self.__data__ is None :
-            logger.debug('read contract code from file %s', self.data_file_name)
-            with open(self.data_file_name, "rb") as df :
-                self.__data__ = df.read()
+            cache = ContractCode.__code_cache__()
+            cache_key = ('source', self.code_hash)
+            self.__data__ = cache.get(cache_key)
+            if self.__data__ is None :
+                logger.debug('read contract code from file %s', self.data_file_name)
+                with open(self.data_file_name, "rb") as df :
+                    self.__data__ = df.read().decode()
+                cache.put(cache_key, self.__data__, len(self.__data__))
 
-        return self.__data__.decode()
+        return self.__data__
 
     # -----------------------------------------------------------------
     def save(self, config) :
@@ -194,6 +321,13 @@ class ContractCode(object) :
             pf.write(serialized)
 
         logger.debug('ccode saved to %s', code_file_name)
+        self.__update_catalog__(config, code_file_name)
+
+    # -----------------------------------------------------------------
+    def __update_catalog__(self, config, code_file_name) :
+        catalog = Catalog.open(config)
+        catalog.update(ContractCode.__catalog_kind__, code_file_name, self.code_hash, self.name,
+                       code_hash=self.code_hash, record=self.serialize())
 
     # -----------------------------------------------------------------
     def deserialize(self, serialized) :
@@ -19,8 +19,11 @@ import json
 import os
 
 from pdo.common.keys import EnclaveKeys
-from pdo.service_client.enclave import EnclaveServiceClient
-from sawtooth.helpers import pdo_connect
+import pdo.service_client.service_data.eservice as eservice_db
+
+from toxaway.models.catalog import Catalog
+from toxaway.models.clients import ServiceClientRegistry
+from toxaway.models.ledger import LedgerClient
 
 import logging
 logger = logging.getLogger(__name__)
@@ -36,16 +39,33 @@ class EnclaveServiceList(object) :
     def load(cls, config) :
         """Compute a list of URLs for known enclave services
         """
-        root = EnclaveService.__root_directory__(config)
-        eservice_files = glob.glob('{0}/*.json'.format(root))
+        EnclaveService.refresh_catalog(config)
+        entries = Catalog.open(config).entries(EnclaveService.__catalog_kind__)
 
         eservice_list = cls(config)
-        for eservice_file in eservice_files :
-            eservice = EnclaveService.load_from_file(config, eservice_file)
-            eservice_list.add(eservice)
+        for entry in entries :
+            eservice_list.add(EnclaveService.from_catalog_entry(entry))
 
         return eservice_list
 
+    # -----------------------------------------------------------------
+    @classmethod
+    def load_page(cls, config, name_prefix=None, cursor=None, limit=50) :
+        """Compute one page of enclave services from the catalog, returns the
+        list and the cursor for the next page
+        """
+        EnclaveService.refresh_catalog(config)
+        catalog = Catalog.open(config)
+
+        (entries, next_cursor) = catalog.query(
+            EnclaveService.__catalog_kind__, name_prefix=name_prefix, cursor=cursor, limit=limit)
+
+        eservice_list = cls(config)
+        for entry in entries :
+            eservice_list.add(EnclaveService.from_catalog_entry(entry))
+
+        return (eservice_list, next_cursor)
+
     # -----------------------------------------------------------------
     def __init__(self, config) :
         self.config = config
@@ -89,6 +109,9 @@ class EnclaveServiceList(object) :
 class EnclaveService(object) :
     """A class to store information about an enclave service
     """
+
+    __catalog_kind__ = 'eservice'
+
     # -----------------------------------------------------------------
     @staticmethod
     def __root_directory__(config) :
@@ -109,13 +132,16 @@ class EnclaveService(object) :
 
     # -----------------------------------------------------------------
     @classmethod
-    def create(cls, config, eservice_url, name=None) :
-        """create a new eservice from a URL and save it
+    def create(cls, config, eservice_url, name=None, eservice_client=None) :
+        """create a new eservice from a URL and save it; a client that
+        was just built for the service may be provided
         """
 
         try :
             logger.info('create eservice for %s', eservice_url)
-            eservice_client = EnclaveServiceClient(eservice_url)
+            # a new client, the service may have restarted with a new enclave
+            if eservice_client is None :
+                eservice_client = ServiceClientRegistry.open(config).eservice_client(eservice_url, fresh=True)
             enclave_info = eservice_client.get_enclave_public_info()
             enclave_id = enclave_info['enclave_id']
         except :
@@ -123,9 +149,7 @@ class EnclaveService(object) :
             return None
 
         try :
-            ledger_config = config["Sawtooth"]
-            client = pdo_connect.PdoRegistryHelper(ledger_config['LedgerURL'])
-            enclave_ledger_info = client.get_enclave_dict(enclave_id)
+            enclave_ledger_info = LedgerClient.open(config).enclave_info(enclave_id)
         except Exception as e :
             logger.info('error getting enclave; %s', str(e))
             raise Exception('failed to retrieve enclave; {}'.format(enclave_id))
@@ -148,6 +172,55 @@ class EnclaveService(object) :
 
         return eservice_object
 
+    # -----------------------------------------------------------------
+    @staticmethod
+    def client_for_enclave(config, enclave_id) :
+        """return the shared client for an enclave; enclaves that are
+        not in the catalog are looked up in the eservice database
+        """
+        entry = Catalog.open(config).lookup(EnclaveService.__catalog_kind__, enclave_id)
+        if entry is None or not entry.url :
+            return eservice_db.get_client_by_id(enclave_id)
+
+        return ServiceClientRegistry.open(config).eservice_client(entry.url)
+
+    # -----------------------------------------------------------------
+    @classmethod
+    def from_catalog_entry(cls, entry) :
+        eservice_object = cls(entry.record)
+        eservice_object.file_name = entry.file_name
+        return eservice_object
+
+    # -----------------------------------------------------------------
+    @classmethod
+    def rebuild_catalog(cls, config) :
+        """scan the content directory and regenerate the catalog
+        entries for enclave services
+        """
+        root = EnclaveService.__root_directory__(config)
+        eservice_files = glob.glob('{0}/*.json'.format(root))
+
+        catalog = Catalog.open(config)
+        catalog.clear(EnclaveService.__catalog_kind__)
+        for eservice_file in eservice_files :
+            eservice = cls.load_from_file(config, eservice_file)
+            eservice.__update_catalog__(config, eservice_file)
+
+        return catalog.entries(EnclaveService.__catalog_kind__)
+
+    # -----------------------------------------------------------------
+    @classmethod
+    def refresh_catalog(cls, config) :
+        """index the enclave service files added or modified since the catalog
+        was last updated and drop the entries for files that were removed
+        """
+        def index(eservice_file) :
+            eservice = cls.load_from_file(config, eservice_file)
+            eservice.__update_catalog__(config, eservice_file)
+
+        root = EnclaveService.__root_directory__(config)
+        Catalog.open(config).reconcile(EnclaveService.__catalog_kind__, root, '.json', index)
+
     # -----------------------------------------------------------------
     @classmethod
     def load_from_file(cls, config, eservice_file_name) :
@@ -177,8 +250,6 @@ class EnclaveService(object) :
 
     # -----------------------------------------------------------------
     def __init__(self, serialized_eservice = None) :
-        self.__eservice_client__ = None
-
         if serialized_eservice :
             self.deserialize(serialized_eservice)
         else :
@@ -205,12 +276,8 @@ class EnclaveService(object) :
         return "\n".join(result)
 
     # -----------------------------------------------------------------
-    @property
-    def eservice_client(self) :
-        if self.__eservice_client__ is None :
-            self.__eservice_client__ = EnclaveServiceClient(self.enclave_service_url)
-
-        return self.__eservice_client__
+    def eservice_client(self, config) :
+        return ServiceClientRegistry.open(config).eservice_client(self.enclave_service_url)
 
     # -----------------------------------------------------------------
     def save(self, config) :
@@ -227,6 +294,13 @@ class EnclaveService(object) :
             pf.write(serialized_eservice)
 
         logger.debug('eservice saved to %s', eservice_file)
+        self.__update_catalog__(config, eservice_file)
+
+    # -----------------------------------------------------------------
+    def __update_catalog__(self, config, eservice_file) :
+        catalog = Catalog.open(config)
+        catalog.update(EnclaveService.__catalog_kind__, eservice_file, self.enclave_id, self.name,
+                       url=self.enclave_service_url, record=self.serialize())
 
     # -----------------------------------------------------------------
     def deserialize(self, serialized_eservice) :
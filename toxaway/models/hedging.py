@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import concurrent.futures
+import threading
+
+from toxaway.models.scheduler import EnclaveScheduler
+
+import logging
+logger = logging.getLogger(__name__)
+
+__all__ = ['RequestHedger']
+
+# XXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXX
+# XXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXX
+class RequestHedger(object) :
+    """Send a read only request to one enclave and, if it has not
+    answered after the hedge delay, to another provisioned enclave; the
+    first good answer wins. The delay defaults to a percentile of the
+    latency observed for the first enclave. Hedges are limited for each
+    request and for each contract so the extra load stays bounded
+    """
+
+    __hedger__ = None
+    __hedger_lock__ = threading.Lock()
+
+    # -----------------------------------------------------------------
+    @classmethod
+    def open(cls, config) :
+        with RequestHedger.__hedger_lock__ :
+            if RequestHedger.__hedger__ is None :
+                RequestHedger.__hedger__ = cls(config)
+
+        return RequestHedger.__hedger__
+
+    # -----------------------------------------------------------------
+    def __init__(self, config) :
+        scheduler_config = config.get('Scheduler', {})
+        self.enabled = scheduler_config.get('Hedging', False)
+        self.delay = scheduler_config.get('HedgeDelay', 0)
+        self.percentile = scheduler_config.get('HedgePercentile', 95)
+        self.default_delay = scheduler_config.get('DefaultHedgeDelay', 0.5)
+        self.max_per_request = scheduler_config.get('MaxHedgesPerRequest', 1)
+        self.max_per_contract = scheduler_config.get('MaxHedgesPerContract', 2)
+
+        self.scheduler = EnclaveScheduler.open(config)
+
+        self.__lock__ = threading.Lock()
+        self.__outstanding__ = {}
+        self.__executor__ = concurrent.futures.ThreadPoolExecutor(
+            max_workers=scheduler_config.get('HedgeThreads', 8), thread_name_prefix='hedge')
+
+        self.requests = 0
+        self.hedges = 0
+        self.hedges_won = 0
+        self.hedges_refused = 0
+
+    # -----------------------------------------------------------------
+    def hedge_delay(self, enclave_id) :
+        if self.delay :
+            return self.delay
+
+        delay = self.scheduler.percentile(enclave_id, self.percentile)
+        return self.default_delay if delay is None else delay
+
+    # -----------------------------------------------------------------
+    def evaluate(self, contract_id, enclave_ids, primary_id, send_request) :
+        """call send_request(enclave_id) for the primary enclave and
+        hedge to the other enclaves as needed; send_request must raise
+        when the enclave refuses the request. returns the first
+        successful result or raises the first error if every request
+        failed
+        """
+        with self.__lock__ :
+            self.requests += 1
+
+        futures = { self.__executor__.submit(send_request, primary_id) : False }
+        tried = [primary_id]
+        errors = []
+        hedges = 0
+
+        while True :
+            can_hedge = hedges < self.max_per_request and len(tried) < len(enclave_ids)
+            timeout = self.hedge_delay(primary_id) if can_hedge else None
+
+            (done, pending) = concurrent.futures.wait(
+                futures.keys(), timeout=timeout, return_when=concurrent.futures.FIRST_COMPLETED)
+
+            for future in done :
+                hedged = futures.pop(future)
+                if future.exception() is None :
+                    if hedged :
+                        with self.__lock__ :
+                            self.hedges_won += 1
+                    return future.result()
+                errors.append(future.exception())
+
+            if can_hedge :
+                if self.__reserve__(contract_id) :
+                    enclave_id = self.scheduler.select(enclave_ids, exclude=tried)
+                    logger.debug('hedge request for %s to enclave %s', contract_id, enclave_id)
+                    future = self.__executor__.submit(send_request, enclave_id)
+                    future.add_done_callback(lambda f : self.__release__(contract_id))
+                    futures[future] = True
+                    tried.append(enclave_id)
+                    hedges += 1
+                    continue
+
+                # the contract is at its limit, stop hedging this request
+                hedges = self.max_per_request
+
+            if not futures :
+                raise errors[0]
+
+    # -----------------------------------------------------------------
+    def statistics(self) :
+        with self.__lock__ :
+            return {
+                'enabled' : self.enabled,
+                'requests' : self.requests,
+                'hedges' : self.hedges,
+                'hedges_won' : self.hedges_won,
+                'hedges_refused' : self.hedges_refused,
+                'outstanding' : sum(self.__outstanding__.values()),
+            }
+
+    # -----------------------------------------------------------------
+    def __reserve__(self, contract_id) :
+        with self.__lock__ :
+            outstanding = self.__outstanding__.get(contract_id, 0)
+            if outstanding >= self.max_per_contract :
+                self.hedges_refused += 1
+                return False
+
+            self.__outstanding__[contract_id] = outstanding + 1
+            self.hedges += 1
+            return True
+
+    # -----------------------------------------------------------------
+    def __release__(self, contract_id) :
+        with self.__lock__ :
+            outstanding = self.__outstanding__.get(contract_id, 1) - 1
+            if outstanding > 0 :
+                self.__outstanding__[contract_id] = outstanding
+            else :
+                self.__outstanding__.pop(contract_id, None)
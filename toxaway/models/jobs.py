@@ -0,0 +1,188 @@
+#!/usr/bin/env python
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import concurrent.futures
+import threading
+import time
+import uuid
+
+from toxaway.models.cache import LRUCache
+
+import logging
+logger = logging.getLogger(__name__)
+
+__all__ = ['InvocationJob', 'InvocationQueue', 'QueueFullException']
+
+# XXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXX
+# XXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXX
+class QueueFullException(Exception) :
+    pass
+
+# XXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXX
+# XXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXX
+class InvocationJob(object) :
+    """A method invocation that runs in the background; the job is
+    owned by the profile that submitted it
+    """
+
+    # -----------------------------------------------------------------
+    def __init__(self, owner, contract_id, expression) :
+        self.job_id = uuid.uuid4().hex
+        self.owner = owner
+        self.contract_id = contract_id
+        self.expression = expression
+
+        self.status = 'pending'
+        self.result = None
+        self.error = None
+
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+
+        self.__done__ = threading.Event()
+
+    # -----------------------------------------------------------------
+    @property
+    def done(self) :
+        return self.__done__.is_set()
+
+    # -----------------------------------------------------------------
+    def wait(self, timeout=None) :
+        """wait for the job to finish, returns True if it has
+        """
+        return self.__done__.wait(timeout)
+
+    # -----------------------------------------------------------------
+    def run(self, function) :
+        self.status = 'running'
+        self.started = time.time()
+        try :
+            self.result = function()
+            self.status = 'complete'
+        except Exception as e :
+            logger.info('job %s failed; %s', self.job_id, str(e))
+            self.error = str(e)
+            self.status = 'failed'
+
+        self.finished = time.time()
+        self.__done__.set()
+
+    # -----------------------------------------------------------------
+    def serialize(self) :
+        serialized = dict()
+        serialized['job_id'] = self.job_id
+        serialized['contract_id'] = self.contract_id
+        serialized['expression'] = self.expression
+        serialized['status'] = self.status
+        serialized['submitted'] = self.submitted
+        serialized['started'] = self.started
+        serialized['finished'] = self.finished
+        if self.done :
+            serialized['result'] = self.result
+            serialized['error'] = self.error
+
+        return serialized
+
+# XXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXX
+# XXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXX
+class InvocationQueue(object) :
+    """A process-wide executor for method invocations; the number of
+    workers and the number of unfinished jobs are bounded so slow
+    enclaves do not tie up the threads that serve requests. Finished
+    jobs are kept for a while so clients can collect the results
+    """
+
+    __queue__ = None
+    __queue_lock__ = threading.Lock()
+
+    # -----------------------------------------------------------------
+    @classmethod
+    def open(cls, config) :
+        with InvocationQueue.__queue_lock__ :
+            if InvocationQueue.__queue__ is None :
+                InvocationQueue.__queue__ = cls(config)
+
+        return InvocationQueue.__queue__
+
+    # -----------------------------------------------------------------
+    @classmethod
+    def shutdown(cls) :
+        with InvocationQueue.__queue_lock__ :
+            if InvocationQueue.__queue__ is not None :
+                InvocationQueue.__queue__.__executor__.shutdown(wait=False)
+                InvocationQueue.__queue__ = None
+
+    # -----------------------------------------------------------------
+    def __init__(self, config) :
+        service_config = config.get('Service', {})
+        self.workers = service_config.get('InvocationThreads', 4)
+        self.max_pending = service_config.get('MaxPendingJobs', 64)
+        retention = service_config.get('JobRetentionTime', 600)
+
+        self.__lock__ = threading.Lock()
+        self.__pending__ = {}
+        self.__finished__ = LRUCache(max_entries=service_config.get('MaxRetainedJobs', 1024), ttl=retention)
+        self.__executor__ = concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix='invoke')
+
+        self.submitted = 0
+        self.rejected = 0
+
+    # -----------------------------------------------------------------
+    def submit(self, job, function) :
+        """queue the function to run for the job, raises
+        QueueFullException when too many jobs are unfinished
+        """
+        with self.__lock__ :
+            if len(self.__pending__) >= self.max_pending :
+                self.rejected += 1
+                raise QueueFullException('too many pending invocations')
+
+            self.__pending__[job.job_id] = job
+            self.submitted += 1
+
+        self.__executor__.submit(self.__run__, job, function)
+        return job
+
+    # -----------------------------------------------------------------
+    def get(self, job_id) :
+        """return the job or None if it is unknown or has expired
+        """
+        with self.__lock__ :
+            job = self.__pending__.get(job_id)
+
+        return job or self.__finished__.get(job_id)
+
+    # -----------------------------------------------------------------
+    def statistics(self) :
+        with self.__lock__ :
+            statistics = {
+                'workers' : self.workers,
+                'pending' : len(self.__pending__),
+                'submitted' : self.submitted,
+                'rejected' : self.rejected,
+            }
+
+        statistics['retained'] = len(self.__finished__)
+        return statistics
+
+    # -----------------------------------------------------------------
+    def __run__(self, job, function) :
+        try :
+            job.run(function)
+        finally :
+            with self.__lock__ :
+                self.__pending__.pop(job.job_id, None)
+                self.__finished__.put(job.job_id, job)
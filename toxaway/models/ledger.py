@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import concurrent.futures
+import threading
+
+from sawtooth.helpers import pdo_connect
+
+from toxaway.models.cache import LRUCache
+
+import logging
+logger = logging.getLogger(__name__)
+
+__all__ = ['LedgerClient']
+
+# XXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXX
+# XXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXX
+class LedgerClient(object) :
+    """A process-wide client for registry lookups on the ledger; each
+    thread keeps its own registry helper, lookups of records that do
+    not change (enclave registrations, state by hash) are cached, and
+    independent lookups may be issued concurrently with submit
+    """
+
+    __clients__ = {}
+    __clients_lock__ = threading.Lock()
+
+    # -----------------------------------------------------------------
+    @classmethod
+    def open(cls, config) :
+        try :
+            ledger_config = config['Sawtooth']
+            ledger_url = ledger_config['LedgerURL']
+        except KeyError :
+            raise Exception('missing ledger configuration')
+
+        with LedgerClient.__clients_lock__ :
+            client = LedgerClient.__clients__.get(ledger_url)
+            if client is None :
+                client = cls(ledger_config)
+                LedgerClient.__clients__[ledger_url] = client
+
+        return client
+
+    # -----------------------------------------------------------------
+    def __init__(self, ledger_config) :
+        self.ledger_url = ledger_config['LedgerURL']
+
+        self.__helpers__ = threading.local()
+        self.__cache__ = LRUCache(
+            max_entries=ledger_config.get('LedgerCacheSize', 1024),
+            ttl=ledger_config.get('LedgerCacheTTL', 300))
+        self.__executor__ = concurrent.futures.ThreadPoolExecutor(
+            max_workers=ledger_config.get('LedgerThreads', 4), thread_name_prefix='ledger')
+
+    # -----------------------------------------------------------------
+    @property
+    def helper(self) :
+        helper = getattr(self.__helpers__, 'helper', None)
+        if helper is None :
+            helper = pdo_connect.PdoRegistryHelper(self.ledger_url)
+            self.__helpers__.helper = helper
+        return helper
+
+    # -----------------------------------------------------------------
+    def submit(self, method, *args) :
+        """run a lookup in the background and return its future
+        """
+        return self.__executor__.submit(method, *args)
+
+    # -----------------------------------------------------------------
+    def contract_info(self, contract_id) :
+        """the contract registration lists the provisioned enclaves,
+        which change while the contract is created, and is never cached
+        """
+        return self.helper.get_contract_dict(contract_id)
+
+    # -----------------------------------------------------------------
+    def ccl_info(self, contract_id) :
+        """the current state of a contract changes with each update and
+        is never cached
+        """
+        return self.helper.get_ccl_info_dict(contract_id)
+
+    # -----------------------------------------------------------------
+    def state_info(self, contract_id, state_hash) :
+        return self.__cached__(('state', contract_id, state_hash), self.helper.get_ccl_state_dict, contract_id, state_hash)
+
+    # -----------------------------------------------------------------
+    def enclave_info(self, enclave_id) :
+        return self.__cached__(('enclave', enclave_id), self.helper.get_enclave_dict, enclave_id)
+
+    # -----------------------------------------------------------------
+    def statistics(self) :
+        return self.__cache__.statistics()
+
+    # -----------------------------------------------------------------
+    def __cached__(self, key, method, *args) :
+        value = self.__cache__.get(key)
+        if value is None :
+            value = method(*args)
+            self.__cache__.put(key, value)
+        return value
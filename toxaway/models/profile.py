@@ -13,12 +13,16 @@
 # limitations under the License.
 
 import glob
+import hashlib
 import json
 import os
+import threading
 
 from pdo.common.keys import ServiceKeys
 import pdo.common.crypto as crypto
 
+from toxaway.models.cache import LRUCache
+
 import logging
 logger = logging.getLogger(__name__)
 
@@ -27,6 +31,49 @@ logger = logging.getLogger(__name__)
 class Profile(object) :
     """A class to store profile information
     """
+
+    __cache__ = None
+    __cache_lock__ = threading.Lock()
+
+    # -----------------------------------------------------------------
+    @staticmethod
+    def __profile_cache__(config) :
+        """return the process-wide cache of decrypted profiles, entries
+        are keyed by profile name and a digest of the encryption key
+        """
+        with Profile.__cache_lock__ :
+            if Profile.__cache__ is None :
+                cache_config = config.get('Cache', {})
+                Profile.__cache__ = LRUCache(
+                    max_entries=cache_config.get('ProfileCacheSize', 32),
+                    ttl=cache_config.get('ProfileCacheTTL', 300))
+
+        return Profile.__cache__
+
+    # -----------------------------------------------------------------
+    @staticmethod
+    def __cache_key__(profile_name, skenc_key) :
+        return (profile_name, hashlib.sha256(bytes(skenc_key)).hexdigest())
+
+    # -----------------------------------------------------------------
+    @staticmethod
+    def __file_stamp__(profile_file) :
+        """capture enough of the file status to detect modifications
+        """
+        try :
+            stat = os.stat(profile_file)
+        except FileNotFoundError :
+            return None
+
+        return (stat.st_mtime_ns, stat.st_size)
+
+    # -----------------------------------------------------------------
+    @staticmethod
+    def cache_statistics() :
+        if Profile.__cache__ is None :
+            return {}
+        return Profile.__cache__.statistics()
+
     # -----------------------------------------------------------------
     @staticmethod
     def __profile_root_directory__(config) :
@@ -78,19 +125,30 @@ class Profile(object) :
         """
         logger.info('load profile for %s', profile_name)
         profile_file = Profile.__profile_file_name__(config, profile_name)
-        if not os.path.exists(profile_file) :
+        file_stamp = Profile.__file_stamp__(profile_file)
+        if file_stamp is None :
             return None
 
+        skenc_key = Profile.__encryption_key__(password)
+        cache = Profile.__profile_cache__(config)
+        cache_key = Profile.__cache_key__(profile_name, skenc_key)
+        cached = cache.get(cache_key, validate=lambda entry : entry[0] == file_stamp)
+        if cached is not None :
+            logger.debug('profile %s found in cache', profile_name)
+            return cached[1]
+
         with open(profile_file, "rb") as pf:
             encrypted_profile = pf.read()
 
         logger.info('profile loaded from %s', profile_file)
 
-        skenc_key = Profile.__encryption_key__(password)
         serialized_profile = crypto.SKENC_DecryptMessage(skenc_key, encrypted_profile)
         serialized_profile = bytes(serialized_profile)
 
-        return cls(profile_name, serialized_profile)
+        profile_object = cls(profile_name, serialized_profile)
+        cache.put(cache_key, (file_stamp, profile_object))
+
+        return profile_object
 
     # -----------------------------------------------------------------
     def __init__(self, name, serialized_profile = None) :
@@ -120,6 +178,12 @@ class Profile(object) :
 
         logger.info('profile saved to %s', profile_file)
 
+        # drop any entries decrypted with an old password and remember
+        # the profile that was just written
+        cache = Profile.__profile_cache__(config)
+        cache.remove_if(lambda key : key[0] == self.name)
+        cache.put(Profile.__cache_key__(self.name, skenc_key), (Profile.__file_stamp__(profile_file), self))
+
     # -----------------------------------------------------------------
     def deserialize(self, serialized_profile) :
         """deserialize the profile
@@ -19,7 +19,9 @@ import json
 import os
 
 from pdo.common.keys import EnclaveKeys
-from pdo.service_client.provisioning import ProvisioningServiceClient
+
+from toxaway.models.catalog import Catalog
+from toxaway.models.clients import ServiceClientRegistry
 
 import logging
 logger = logging.getLogger(__name__)
@@ -35,16 +37,33 @@ class ProvisioningServiceList(object) :
     def load(cls, config) :
         """Compute a list of URLs for known enclave services
         """
-        root = ProvisioningService.__root_directory__(config)
-        pservice_files = glob.glob('{0}/*.json'.format(root))
+        ProvisioningService.refresh_catalog(config)
+        entries = Catalog.open(config).entries(ProvisioningService.__catalog_kind__)
 
         pservice_list = cls(config)
-        for pservice_file in pservice_files :
-            pservice = ProvisioningService.load(config, pservice_file, use_raw=True)
-            pservice_list.add(pservice)
+        for entry in entries :
+            pservice_list.add(ProvisioningService.from_catalog_entry(entry))
 
         return pservice_list
 
+    # -----------------------------------------------------------------
+    @classmethod
+    def load_page(cls, config, name_prefix=None, cursor=None, limit=50) :
+        """Compute one page of provisioning services from the catalog, returns the
+        list and the cursor for the next page
+        """
+        ProvisioningService.refresh_catalog(config)
+        catalog = Catalog.open(config)
+
+        (entries, next_cursor) = catalog.query(
+            ProvisioningService.__catalog_kind__, name_prefix=name_prefix, cursor=cursor, limit=limit)
+
+        pservice_list = cls(config)
+        for entry in entries :
+            pservice_list.add(ProvisioningService.from_catalog_entry(entry))
+
+        return (pservice_list, next_cursor)
+
     # -----------------------------------------------------------------
     def __init__(self, config) :
         self.config = config
@@ -89,6 +108,9 @@ class ProvisioningServiceList(object) :
 class ProvisioningService(object) :
     """A class to store information about an enclave service
     """
+
+    __catalog_kind__ = 'pservice'
+
     # -----------------------------------------------------------------
     @staticmethod
     def __root_directory__(config) :
@@ -109,13 +131,16 @@ class ProvisioningService(object) :
 
     # -----------------------------------------------------------------
     @classmethod
-    def create(cls, config, service_url, name=None) :
-        """create a new pservice from a URL and save it
+    def create(cls, config, service_url, name=None, pservice_client=None) :
+        """create a new pservice from a URL and save it; a client that
+        was just built for the service may be provided
         """
 
         try :
             logger.info('create pservice for %s', service_url)
-            pservice_client = ProvisioningServiceClient(service_url)
+            # a new client, the service may have restarted with new keys
+            if pservice_client is None :
+                pservice_client = ServiceClientRegistry.open(config).pservice_client(service_url, fresh=True)
         except :
             logger.warn('failed to retrieve pservice information')
             return None
@@ -134,6 +159,41 @@ class ProvisioningService(object) :
 
         return pservice_object
 
+    # -----------------------------------------------------------------
+    @classmethod
+    def from_catalog_entry(cls, entry) :
+        return cls(entry.record)
+
+    # -----------------------------------------------------------------
+    @classmethod
+    def rebuild_catalog(cls, config) :
+        """scan the content directory and regenerate the catalog
+        entries for provisioning services
+        """
+        root = ProvisioningService.__root_directory__(config)
+        pservice_files = glob.glob('{0}/*.json'.format(root))
+
+        catalog = Catalog.open(config)
+        catalog.clear(ProvisioningService.__catalog_kind__)
+        for pservice_file in pservice_files :
+            pservice = cls.load(config, pservice_file, use_raw=True)
+            pservice.__update_catalog__(config, pservice_file)
+
+        return catalog.entries(ProvisioningService.__catalog_kind__)
+
+    # -----------------------------------------------------------------
+    @classmethod
+    def refresh_catalog(cls, config) :
+        """index the provisioning service files added or modified since the catalog
+        was last updated and drop the entries for files that were removed
+        """
+        def index(pservice_file) :
+            pservice = cls.load(config, pservice_file, use_raw=True)
+            pservice.__update_catalog__(config, pservice_file)
+
+        root = ProvisioningService.__root_directory__(config)
+        Catalog.open(config).reconcile(ProvisioningService.__catalog_kind__, root, '.json', index)
+
     # -----------------------------------------------------------------
     @classmethod
     def load(cls, config, file_name, use_raw=False) :
@@ -155,7 +215,6 @@ class ProvisioningService(object) :
 
     # -----------------------------------------------------------------
     def __init__(self, serialized_pservice = None) :
-        self.__pservice_client__ = None
         if serialized_pservice :
             self.deserialize(serialized_pservice)
         else :
@@ -170,12 +229,8 @@ class ProvisioningService(object) :
         return self.service_key
 
     # -----------------------------------------------------------------
-    @property
-    def pservice_client(self) :
-        if self.__pservice_client__ is None :
-            self.__pservice_client__ = ProvisioningServiceClient(self.service_url)
-
-        return self.__pservice_client__
+    def pservice_client(self, config) :
+        return ServiceClientRegistry.open(config).pservice_client(self.service_url)
 
     # -----------------------------------------------------------------
     def save(self, config) :
@@ -192,6 +247,13 @@ class ProvisioningService(object) :
             pf.write(serialized_pservice)
 
         logger.info('pservice saved to %s', file_name)
+        self.__update_catalog__(config, file_name)
+
+    # -----------------------------------------------------------------
+    def __update_catalog__(self, config, file_name) :
+        catalog = Catalog.open(config)
+        catalog.update(ProvisioningService.__catalog_kind__, file_name, self.service_id, self.name,
+                       url=self.service_url, record=self.serialize())
 
     # -----------------------------------------------------------------
     def deserialize(self, serialized_pservice) :
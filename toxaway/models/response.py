@@ -12,11 +12,18 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import random
+import hashlib
+import threading
 
-import pdo.service_client.service_data.eservice as eservice_db
 from pdo.client.SchemeExpression import SchemeExpression
+from toxaway.models.cache import LRUCache
+from toxaway.models.commits import CommitManager
+from toxaway.models.contract import Contract, ContractRegistry
 from toxaway.models.eservice import EnclaveService
+from toxaway.models.hedging import RequestHedger
+from toxaway.models.scheduler import EnclaveScheduler
+from toxaway.models.sequencer import ContractSequencer
+from toxaway.models.state import StateCache
 
 import logging
 logger = logging.getLogger(__name__)
@@ -32,48 +39,182 @@ class InvocationException(Exception) :
 # XXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXX
 class ContractResponse(object) :
 
+    __query_cache__ = None
+    __query_cache_lock__ = threading.Lock()
+
+    ## ----------------------------------------------------------------
+    @staticmethod
+    def __enclave_id__(config, contract, preferred_enclave=None) :
+        preferred_enclave = preferred_enclave or contract.update_enclave
+        logger.info('load enclave service from %s', preferred_enclave)
+        if preferred_enclave == 'random' :
+            preferred_enclave = EnclaveScheduler.open(config).select(contract.provisioned_enclaves)
+
+        return preferred_enclave
+
+    ## ----------------------------------------------------------------
+    @staticmethod
+    def __enclave_client__(config, contract, preferred_enclave=None) :
+        enclave_id = ContractResponse.__enclave_id__(config, contract, preferred_enclave)
+        return EnclaveService.client_for_enclave(config, enclave_id)
+
+    ## ----------------------------------------------------------------
+    @staticmethod
+    def __results_cache__(config) :
+        with ContractResponse.__query_cache_lock__ :
+            if ContractResponse.__query_cache__ is None :
+                cache_config = config.get('Cache', {})
+                ContractResponse.__query_cache__ = LRUCache(max_entries=cache_config.get('QueryCacheSize', 4096))
+
+        return ContractResponse.__query_cache__
+
+    ## ----------------------------------------------------------------
+    @staticmethod
+    def cache_statistics() :
+        if ContractResponse.__query_cache__ is None :
+            return {}
+        return ContractResponse.__query_cache__.statistics()
+
+    ## ----------------------------------------------------------------
+    @classmethod
+    def query_method(cls, config, profile, contract, expression, hedge=None) :
+        """evaluate a read only expression on the invoke enclave; the
+        state is neither saved nor committed and results are cached
+        until the contract state changes. the invoker is part of the
+        key since a method may answer differently for each caller.
+        with hedging, a slow enclave is backed up by another one; hedge
+        overrides the configured default
+        """
+        contract = ContractSequencer.open(config).latest(contract)
+        state_hash = StateCache.state_hash(contract.contract_state)
+        invoker = hashlib.sha256(profile.keys.verifying_key.encode('utf8')).hexdigest()
+        cache_key = (contract.contract_id, state_hash, invoker, expression)
+
+        cache = ContractResponse.__results_cache__(config)
+        response = cache.get(cache_key)
+        if response is not None :
+            return response
+
+        def send_request(enclave_id) :
+            eservice = EnclaveService.client_for_enclave(config, enclave_id)
+            update_request = contract.create_update_request(profile.keys, expression, eservice)
+            with EnclaveScheduler.open(config).track(enclave_id) :
+                update_response = update_request.evaluate()
+                # a refused request counts against the enclave, and a
+                # hedged request moves on to the other enclaves
+                if update_response.status is False :
+                    raise InvocationException(update_response.response)
+
+            return update_response
+
+        hedger = RequestHedger.open(config)
+        enclave_id = ContractResponse.__enclave_id__(config, contract, contract.invoke_enclave)
+        if hedge is None :
+            hedge = hedger.enabled
+
+        if hedge :
+            update_response = hedger.evaluate(
+                contract.contract_id, contract.provisioned_enclaves, enclave_id, send_request)
+        else :
+            update_response = send_request(enclave_id)
+
+        if update_response.state_changed :
+            raise InvocationException('method changes the contract state and cannot be used as a query')
+
+        response = cls.__parse_result__(update_response.result)
+        cache.put(cache_key, response)
+        return response
+
     ## ----------------------------------------------------------------
     @classmethod
     def invoke_method(cls, config, profile, contract, expression) :
-        logger.info('load enclave service from %s', contract.update_enclave)
-        update_enclave = contract.update_enclave
-        if update_enclave == 'random' :
-            update_enclave = random.choice(contract.provisioned_enclaves)
+        with ContractSequencer.open(config).sequence(contract) as contract :
+            eservice = ContractResponse.__enclave_client__(config, contract)
+            return cls.__evaluate__(config, profile, contract, expression, eservice)
 
-        eservice = eservice_db.get_client_by_id(update_enclave)
-        ## eservice = EnclaveService.load(config, update_enclave).eservice_client
-        update_request = contract.create_update_request(profile.keys, expression, eservice)
-        update_response = update_request.evaluate()
+    ## ----------------------------------------------------------------
+    @classmethod
+    def invoke_batch(cls, config, profile, contract, expressions, stop_on_error=False) :
+        """evaluate the expressions in order against one enclave; the
+        state from each update is used by the next expression. returns
+        a list of (response, error) pairs, one for each expression that
+        was evaluated
+        """
+        results = []
+        with ContractSequencer.open(config).sequence(contract) as contract :
+            eservice = ContractResponse.__enclave_client__(config, contract)
+            for expression in expressions :
+                try :
+                    results.append((cls.__evaluate__(config, profile, contract, expression, eservice), None))
+                except Exception as e :
+                    logger.info('batch invocation failed on %s; %s', expression, str(e))
+                    results.append((None, str(e)))
+                    if stop_on_error :
+                        break
+
+        return results
 
-        if update_response.status is False :
-            raise InvocationException(update_response.response)
+    ## ----------------------------------------------------------------
+    @classmethod
+    def __evaluate__(cls, config, profile, contract, expression, eservice) :
+        update_request = contract.create_update_request(profile.keys, expression, eservice)
+        with EnclaveScheduler.open(config).track(eservice.enclave_id) :
+            update_response = update_request.evaluate()
+            if update_response.status is False :
+                raise InvocationException(update_response.response)
 
         if update_response.state_changed :
-            logger.info('update the contract state')
-            try :
-                contract_config = config['ContentPaths']
-                state_directory = contract_config['State']
-            except KeyError :
-                raise Exception('missing contract data configuration')
+            if 'Sawtooth' not in config :
+                raise Exception('missing ledger configuration')
 
-            contract.contract_state.save_to_cache(data_dir = state_directory)
-            contract.set_state(update_response.raw_state)
+            # room for the commit is reserved before the new state is
+            # kept, an update that is refused leaves the contract as it was
+            commits = CommitManager.open(config)
+            commits.admit()
+            try :
+                logger.info('update the contract state')
+                ContractResponse.__invalidate__(contract.contract_id)
+                contract.set_state(update_response.raw_state)
+                StateCache.open(config).save(contract.contract_state)
+            except :
+                commits.release()
+                raise
 
             logger.info('submit the transaction')
-            try :
-                ledger_config = config['Sawtooth']
-            except KeyError :
-                raise Exception('missing ledger configuration')
+            commits.submit(
+                contract.contract_id, update_response, lambda : ContractResponse.__rejected__(config, contract))
+
+        return cls.__parse_result__(update_response.result)
 
-            update_response.commit_asynchronously(ledger_config)
+    ## ----------------------------------------------------------------
+    @staticmethod
+    def __rejected__(config, contract) :
+        """the ledger did not accept an update; the contract that carries
+        the rejected state is dropped from the sequencer and the registry
+        so the next update starts from the committed state
+        """
+        logger.info('reset contract %s to the committed state', contract.contract_id)
+        ContractSequencer.open(config).forget(contract.contract_id, contract)
+        ContractRegistry.open(config).remove(Contract.__file_name__(config, contract.contract_id))
+
+    ## ----------------------------------------------------------------
+    @staticmethod
+    def __invalidate__(contract_id) :
+        """drop the cached query results for a contract whose state changed
+        """
+        if ContractResponse.__query_cache__ is not None :
+            ContractResponse.__query_cache__.remove_if(lambda key : key[0] == contract_id)
 
+    ## ----------------------------------------------------------------
+    @classmethod
+    def __parse_result__(cls, result) :
         # first try to parse the result as a Scheme expression, if that
         # fails, then just treat it as a string and return it; we know
         # that the eservice thinks this was a good response
         try :
-            expr = SchemeExpression.ParseExpression(update_response.result)
+            expr = SchemeExpression.ParseExpression(result)
         except Exception as e :
-            expr = SchemeExpression.make_string(update_response.result)
+            expr = SchemeExpression.make_string(result)
 
         return cls(expr)
 
@@ -81,6 +222,10 @@ class ContractResponse(object) :
     def __init__(self, result) :
         self.__result__ = result
 
+    ## ----------------------------------------------------------------
+    def __str__(self) :
+        return str(self.__result__)
+
     ## ----------------------------------------------------------------
     def __getattr__(self, attr) :
         if hasattr(self.__result__, attr) :
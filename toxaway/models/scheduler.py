@@ -0,0 +1,209 @@
+#!/usr/bin/env python
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import collections
+import contextlib
+import random
+import threading
+import time
+
+import logging
+logger = logging.getLogger(__name__)
+
+__all__ = ['EnclaveScheduler']
+
+# XXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXX
+# XXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXX
+class EnclaveStatistics(object) :
+    """Request counts and smoothed latency and error rate for one enclave
+    """
+
+    # -----------------------------------------------------------------
+    def __init__(self, enclave_id) :
+        self.enclave_id = enclave_id
+        self.outstanding = 0
+        self.requests = 0
+        self.errors = 0
+        self.latency = None
+        self.error_rate = 0.0
+        self.last_used = None
+        self.samples = collections.deque(maxlen=128)
+
+    # -----------------------------------------------------------------
+    def record(self, latency, failed, decay) :
+        self.requests += 1
+        self.last_used = time.time()
+        self.samples.append(latency)
+        if failed :
+            self.errors += 1
+
+        if self.latency is None :
+            self.latency = latency
+        else :
+            self.latency = decay * latency + (1.0 - decay) * self.latency
+        self.error_rate = decay * (1.0 if failed else 0.0) + (1.0 - decay) * self.error_rate
+
+    # -----------------------------------------------------------------
+    def percentile(self, p) :
+        """return the latency below which p percent of the recent
+        requests finished, None if there are no samples
+        """
+        if not self.samples :
+            return None
+
+        samples = sorted(self.samples)
+        return samples[min(len(samples) - 1, int(len(samples) * p / 100.0))]
+
+    # -----------------------------------------------------------------
+    def serialize(self) :
+        serialized = dict()
+        serialized['outstanding'] = self.outstanding
+        serialized['requests'] = self.requests
+        serialized['errors'] = self.errors
+        serialized['latency'] = self.latency
+        serialized['error_rate'] = self.error_rate
+        serialized['p95'] = self.percentile(95)
+        serialized['last_used'] = self.last_used
+        return serialized
+
+# XXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXX
+# XXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXX
+class EnclaveScheduler(object) :
+    """A process-wide policy for choosing the enclave that handles a
+    request; latency and errors are collected for every request sent
+    through track. The policies are:
+
+    random -- uniform choice
+    least-outstanding -- fewest requests in flight
+    ewma -- lowest expected cost from smoothed latency and error rate
+    power-of-two -- lower expected cost of two enclaves chosen at random
+    """
+
+    __scheduler__ = None
+    __scheduler_lock__ = threading.Lock()
+
+    # -----------------------------------------------------------------
+    @classmethod
+    def open(cls, config) :
+        with EnclaveScheduler.__scheduler_lock__ :
+            if EnclaveScheduler.__scheduler__ is None :
+                EnclaveScheduler.__scheduler__ = cls(config)
+
+        return EnclaveScheduler.__scheduler__
+
+    # -----------------------------------------------------------------
+    def __init__(self, config) :
+        scheduler_config = config.get('Scheduler', {})
+        self.policy = scheduler_config.get('Policy', 'power-of-two')
+        self.decay = scheduler_config.get('Decay', 0.2)
+        self.error_penalty = scheduler_config.get('ErrorPenalty', 5.0)
+
+        self.__policies__ = {
+            'random' : self.__select_random__,
+            'least-outstanding' : self.__select_least_outstanding__,
+            'ewma' : self.__select_ewma__,
+            'power-of-two' : self.__select_power_of_two__,
+        }
+        if self.policy not in self.__policies__ :
+            raise ValueError('unknown enclave scheduling policy {0}'.format(self.policy))
+
+        self.__lock__ = threading.Lock()
+        self.__enclaves__ = {}
+
+    # -----------------------------------------------------------------
+    def select(self, enclave_ids, exclude=()) :
+        """choose one of the enclaves, other than those excluded,
+        according to the policy
+        """
+        enclave_ids = [e for e in enclave_ids if e not in exclude]
+        if not enclave_ids :
+            raise ValueError('no enclaves to choose from')
+        if len(enclave_ids) == 1 :
+            return enclave_ids[0]
+
+        with self.__lock__ :
+            enclave_id = self.__policies__[self.policy](enclave_ids)
+
+        logger.debug('scheduled enclave %s', enclave_id)
+        return enclave_id
+
+    # -----------------------------------------------------------------
+    @contextlib.contextmanager
+    def track(self, enclave_id) :
+        """record the latency of the request made in the body and count
+        it as an error if the body raises an exception
+        """
+        with self.__lock__ :
+            self.__statistics__(enclave_id).outstanding += 1
+
+        start = time.time()
+        failed = False
+        try :
+            yield
+        except :
+            failed = True
+            raise
+        finally :
+            latency = time.time() - start
+            with self.__lock__ :
+                statistics = self.__statistics__(enclave_id)
+                statistics.outstanding -= 1
+                statistics.record(latency, failed, self.decay)
+
+    # -----------------------------------------------------------------
+    def percentile(self, enclave_id, p) :
+        with self.__lock__ :
+            return self.__statistics__(enclave_id).percentile(p)
+
+    # -----------------------------------------------------------------
+    def statistics(self) :
+        with self.__lock__ :
+            enclaves = dict(map(lambda s : (s.enclave_id, s.serialize()), self.__enclaves__.values()))
+
+        return { 'policy' : self.policy, 'enclaves' : enclaves }
+
+    # -----------------------------------------------------------------
+    def __statistics__(self, enclave_id) :
+        statistics = self.__enclaves__.get(enclave_id)
+        if statistics is None :
+            statistics = EnclaveStatistics(enclave_id)
+            self.__enclaves__[enclave_id] = statistics
+        return statistics
+
+    # -----------------------------------------------------------------
+    def __cost__(self, enclave_id) :
+        """expected cost of a request; enclaves that have not been used
+        cost nothing so they are tried early
+        """
+        statistics = self.__statistics__(enclave_id)
+        latency = statistics.latency or 0.0
+        return latency * (1 + statistics.outstanding) + self.error_penalty * statistics.error_rate
+
+    # -----------------------------------------------------------------
+    def __select_random__(self, enclave_ids) :
+        return random.choice(enclave_ids)
+
+    # -----------------------------------------------------------------
+    def __select_least_outstanding__(self, enclave_ids) :
+        random.shuffle(enclave_ids)
+        return min(enclave_ids, key=lambda e : self.__statistics__(e).outstanding)
+
+    # -----------------------------------------------------------------
+    def __select_ewma__(self, enclave_ids) :
+        random.shuffle(enclave_ids)
+        return min(enclave_ids, key=self.__cost__)
+
+    # -----------------------------------------------------------------
+    def __select_power_of_two__(self, enclave_ids) :
+        return min(random.sample(enclave_ids, 2), key=self.__cost__)
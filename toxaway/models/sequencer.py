@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import contextlib
+import threading
+
+from toxaway.models.cache import LRUCache
+
+import logging
+logger = logging.getLogger(__name__)
+
+__all__ = ['ContractSequencer']
+
+# XXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXX
+# XXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXX
+class __Sequence__(object) :
+    """A first come, first served queue of updates to one contract
+    """
+
+    # -----------------------------------------------------------------
+    def __init__(self) :
+        self.condition = threading.Condition()
+        self.next_ticket = 0
+        self.serving = 0
+        self.users = 0
+        self.resets = 0
+        self.active = None
+
+    # -----------------------------------------------------------------
+    def acquire(self) :
+        with self.condition :
+            ticket = self.next_ticket
+            self.next_ticket += 1
+            while ticket != self.serving :
+                self.condition.wait()
+
+    # -----------------------------------------------------------------
+    def release(self) :
+        with self.condition :
+            self.serving += 1
+            self.condition.notify_all()
+
+    # -----------------------------------------------------------------
+    @property
+    def waiting(self) :
+        with self.condition :
+            return self.next_ticket - self.serving
+
+# XXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXX
+# XXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXX
+class ContractSequencer(object) :
+    """A process-wide sequencer that runs the updates to a contract one
+    at a time in the order they arrive; updates to different contracts
+    run in parallel. The contract that carries the state produced by
+    the last update is kept so the next update starts from it even while
+    the earlier commits are still in flight and the file on disk (and
+    the ledger) still describe an older state
+    """
+
+    __sequencer__ = None
+    __sequencer_lock__ = threading.Lock()
+
+    # -----------------------------------------------------------------
+    @classmethod
+    def open(cls, config) :
+        with ContractSequencer.__sequencer_lock__ :
+            if ContractSequencer.__sequencer__ is None :
+                ContractSequencer.__sequencer__ = cls(config)
+
+        return ContractSequencer.__sequencer__
+
+    # -----------------------------------------------------------------
+    def __init__(self, config) :
+        sequencer_config = config.get('Sequencer', {})
+
+        self.__lock__ = threading.Lock()
+        self.__sequences__ = {}
+        self.__chained__ = LRUCache(
+            max_entries=sequencer_config.get('ChainedContracts', 1024),
+            ttl=sequencer_config.get('ChainRetentionTime', 300))
+
+    # -----------------------------------------------------------------
+    @contextlib.contextmanager
+    def sequence(self, contract) :
+        """wait for the earlier updates to the contract to finish and
+        yield the contract that holds the most recent state; the body
+        must run the update against the yielded contract
+        """
+        contract_id = contract.contract_id
+        with self.__lock__ :
+            sequence = self.__sequences__.get(contract_id)
+            if sequence is None :
+                sequence = __Sequence__()
+                self.__sequences__[contract_id] = sequence
+            sequence.users += 1
+
+        try :
+            sequence.acquire()
+            try :
+                with self.__lock__ :
+                    resets = sequence.resets
+                    sequence.active = self.__chained__.get(contract_id) or contract
+                yield sequence.active
+
+                # a chain that was reset while the update ran is not kept
+                with self.__lock__ :
+                    if sequence.resets == resets :
+                        self.__chained__.put(contract_id, sequence.active)
+            finally :
+                sequence.active = None
+                sequence.release()
+        finally :
+            with self.__lock__ :
+                sequence.users -= 1
+                if sequence.users == 0 :
+                    self.__sequences__.pop(contract_id, None)
+
+    # -----------------------------------------------------------------
+    def latest(self, contract) :
+        """return the contract that holds the most recent state without
+        waiting for updates in progress, for read only access
+        """
+        return self.__chained__.get(contract.contract_id) or contract
+
+    # -----------------------------------------------------------------
+    def forget(self, contract_id, contract=None) :
+        """drop the chained contract, the next update starts from the
+        contract it is given; called when a commit fails. when a
+        contract is given the chain is
+        dropped only if that contract is the one chained or in use, a
+        chain started after an earlier failure is not dropped by later
+        failures
+        """
+        with self.__lock__ :
+            sequence = self.__sequences__.get(contract_id)
+            if contract is not None :
+                active = sequence.active if sequence is not None else None
+                if contract is not self.__chained__.get(contract_id) and contract is not active :
+                    return
+
+            self.__chained__.remove(contract_id)
+            if sequence is not None :
+                sequence.resets += 1
+
+    # -----------------------------------------------------------------
+    def saved(self, contract) :
+        """the contract file was rewritten; the chained contract and the
+        one in use take the saved extra data and enclaves so later
+        updates see the new name and preferences, the state they carry
+        is kept since its commits may still be in flight
+        """
+        contract_id = contract.contract_id
+        with self.__lock__ :
+            sequence = self.__sequences__.get(contract_id)
+            targets = [self.__chained__.get(contract_id)]
+            if sequence is not None :
+                targets.append(sequence.active)
+
+        for target in targets :
+            if target is not None and target is not contract :
+                target.extra_data = dict(contract.extra_data)
+                target.enclave_map = dict(contract.enclave_map)
+
+    # -----------------------------------------------------------------
+    def statistics(self) :
+        with self.__lock__ :
+            active = len(self.__sequences__)
+            waiting = sum(map(lambda s : s.waiting, self.__sequences__.values()))
+
+        statistics = self.__chained__.statistics()
+        statistics['active'] = active
+        statistics['waiting'] = waiting
+        return statistics
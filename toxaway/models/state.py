@@ -0,0 +1,211 @@
+#!/usr/bin/env python
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import base64
+import json
+import lzma
+import os
+import tempfile
+import threading
+import zlib
+
+from pdo.contract.state import ContractState as pdo_contract_state
+import pdo.common.crypto as crypto
+
+from toxaway.models.cache import LRUCache
+
+import logging
+logger = logging.getLogger(__name__)
+
+__all__ = ['StateCache']
+
+# XXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXX
+# XXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXX
+class StateCache(object) :
+    """A memory resident tier in front of the contract state cache in
+    the State directory; states are keyed by contract id and state
+    hash, held within a byte budget and written through to disk.
+
+    States may optionally be written in a compressed format, files in
+    that format start with a marker so both formats can be read
+    """
+
+    __caches__ = {}
+    __caches_lock__ = threading.Lock()
+
+    __marker__ = b'TXSC'
+    __compressors__ = {
+        'zlib' : (b'z', zlib.compress, zlib.decompress),
+        'lzma' : (b'x', lzma.compress, lzma.decompress),
+    }
+
+    # -----------------------------------------------------------------
+    @staticmethod
+    def encode_state(encrypted_state, compression) :
+        """encode a base64 encrypted state in the compressed format
+        """
+        (method, compress, decompress) = StateCache.__compressors__[compression]
+        return StateCache.__marker__ + method + compress(base64.b64decode(encrypted_state))
+
+    # -----------------------------------------------------------------
+    @staticmethod
+    def decode_state(data) :
+        """decode a state in the compressed format, returns None if the
+        data is not in the compressed format
+        """
+        marker_length = len(StateCache.__marker__)
+        if not data.startswith(StateCache.__marker__) :
+            return None
+
+        method = data[marker_length:marker_length+1]
+        for (tag, compress, decompress) in StateCache.__compressors__.values() :
+            if tag == method :
+                return base64.b64encode(decompress(data[marker_length+1:])).decode('ascii')
+
+        raise ValueError('unknown state compression method {0}'.format(method))
+
+    # -----------------------------------------------------------------
+    @staticmethod
+    def migrate_file(file_name, compression) :
+        """rewrite a state file from the original json format to the
+        compressed format; returns the sizes before and after or None
+        if the file is not an uncompressed state file
+        """
+        with open(file_name, "rb") as sf :
+            data = sf.read()
+
+        if data.startswith(StateCache.__marker__) :
+            return None
+
+        try :
+            encrypted_state = json.loads(data.decode('utf-8'))['EncryptedState']
+        except (ValueError, KeyError, TypeError, UnicodeDecodeError) :
+            return None
+
+        encoded = StateCache.encode_state(encrypted_state, compression)
+        StateCache.__write_file__(file_name, encoded)
+
+        return (len(data), len(encoded))
+
+    # -----------------------------------------------------------------
+    @staticmethod
+    def __write_file__(file_name, data) :
+        state_dir = os.path.dirname(file_name)
+        if not os.path.isdir(state_dir) :
+            os.makedirs(state_dir)
+
+        with tempfile.NamedTemporaryFile(dir=state_dir, delete=False) as tf :
+            tf.write(data)
+        os.replace(tf.name, file_name)
+
+    # -----------------------------------------------------------------
+    @staticmethod
+    def __state_root_directory__(config) :
+        path_config = config.get('ContentPaths', {})
+        return os.path.realpath(path_config.get('State', os.path.join(os.environ['HOME'], '.toxaway')))
+
+    # -----------------------------------------------------------------
+    @staticmethod
+    def state_hash(state) :
+        """compute the base64 encoded hash of a contract state, this is
+        the form the ledger uses to identify the state
+        """
+        state_byte_array = crypto.base64_to_byte_array(state.encrypted_state)
+        return crypto.byte_array_to_base64(crypto.compute_message_hash(state_byte_array))
+
+    # -----------------------------------------------------------------
+    @classmethod
+    def open(cls, config) :
+        state_root = StateCache.__state_root_directory__(config)
+        with StateCache.__caches_lock__ :
+            state_cache = StateCache.__caches__.get(state_root)
+            if state_cache is None :
+                state_cache = cls(config)
+                StateCache.__caches__[state_root] = state_cache
+
+        return state_cache
+
+    # -----------------------------------------------------------------
+    def __init__(self, config) :
+        cache_config = config.get('Cache', {})
+        self.state_root = StateCache.__state_root_directory__(config)
+        self.compression = None
+        if cache_config.get('CompressState', False) :
+            self.compression = cache_config.get('StateCompression', 'zlib')
+            if self.compression not in StateCache.__compressors__ :
+                raise ValueError('unknown state compression method {0}'.format(self.compression))
+
+        self.__states__ = LRUCache(max_bytes=cache_config.get('StateCacheBytes', 64 * 1024 * 1024))
+
+    # -----------------------------------------------------------------
+    @property
+    def cache_directory(self) :
+        """the directory below the State root where pdo keeps state files
+        """
+        return os.path.join(self.state_root, pdo_contract_state.__path__)
+
+    # -----------------------------------------------------------------
+    def read(self, contract_id, state_hash) :
+        """return the state from memory or from the State directory,
+        None if the state is in neither
+        """
+        state = self.__states__.get((contract_id, state_hash))
+        if state is not None :
+            return state
+
+        state = self.__read_file__(contract_id, state_hash)
+        if state is not None :
+            self.__remember__(contract_id, state_hash, state)
+
+        return state
+
+    # -----------------------------------------------------------------
+    def save(self, state) :
+        """save the state in memory and write it through to the State
+        directory
+        """
+        state_hash = StateCache.state_hash(state)
+        if self.compression :
+            file_name = pdo_contract_state.__cache_filename__(state.contract_id, state_hash, self.state_root)
+            StateCache.__write_file__(file_name, StateCache.encode_state(state.encrypted_state, self.compression))
+        else :
+            state.save_to_cache(data_dir=self.state_root)
+
+        self.__remember__(state.contract_id, state_hash, state)
+
+    # -----------------------------------------------------------------
+    def statistics(self) :
+        return self.__states__.statistics()
+
+    # -----------------------------------------------------------------
+    def __read_file__(self, contract_id, state_hash) :
+        """read a state file in either format, files in the original
+        format are parsed by pdo
+        """
+        file_name = pdo_contract_state.__cache_filename__(contract_id, state_hash, self.state_root)
+        try :
+            with open(file_name, "rb") as sf :
+                data = sf.read()
+        except FileNotFoundError :
+            return None
+
+        encrypted_state = StateCache.decode_state(data)
+        if encrypted_state is None :
+            return pdo_contract_state.read_from_cache(contract_id, state_hash, data_dir=self.state_root)
+
+        return pdo_contract_state(contract_id, encrypted_state)
+
+    # -----------------------------------------------------------------
+    def __remember__(self, contract_id, state_hash, state) :
+        self.__states__.put((contract_id, state_hash), state, len(state.encrypted_state or ''))
@@ -13,68 +13,158 @@
 # limitations under the License.
 
 import argparse
+import concurrent.futures
+import hashlib
 import os
 import sys
+import threading
+import time
 import toml
 
 import pdo.common.config as pconfig
 import pdo.common.keys as keys
 import pdo.common.logger as plogger
 
-from toxaway.models.eservice import EnclaveService
-from toxaway.models.pservice import ProvisioningService
-from toxaway.models.contract_code import ContractCode
+from toxaway.models.clients import ServiceClientRegistry
+from toxaway.models.eservice import EnclaveService, EnclaveServiceList
+from toxaway.models.pservice import ProvisioningService, ProvisioningServiceList
+from toxaway.models.contract_code import ContractCode, ContractCodeList
 
 import logging
 logger = logging.getLogger(__name__)
 
 # -----------------------------------------------------------------
 # -----------------------------------------------------------------
-def LocalMain(config, data) :
-    for info in data.get('EService', []) :
+def RunWithTimeout(function, timeout) :
+    """run the function in its own thread and wait at most timeout
+    seconds for it; a function that times out is left to finish in the
+    background
+    """
+    outcome = {}
+    def target() :
         try :
-            url = info['url']
-            name = info['name']
-        except KeyError as ke :
-            logger.error('missing required eservice data field %s', str(ke))
-            continue
-
-        try :
-            eservice = EnclaveService.create(config, url, name)
+            outcome['result'] = function()
         except Exception as e :
-            logger.error('failed to create the enclave service; %s', str(e))
-            continue
+            outcome['error'] = e
 
-    for info in data.get('PService', []) :
-        try :
-            url = info['url']
-            name = info['name']
-        except KeyError as ke :
-            logger.error('missing required pservice data field %s', str(ke))
-            continue
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    if thread.is_alive() :
+        raise Exception('timed out after {0} seconds'.format(timeout))
+    if 'error' in outcome :
+        raise outcome['error']
+    return outcome['result']
 
-        try :
-            pservice = ProvisioningService.create(config, url, name)
-        except Exception as e :
-            logger.error('failed to create the provisioning service; %s', str(e))
-            continue
+# -----------------------------------------------------------------
+# -----------------------------------------------------------------
+def RegisterEService(config, eservices, info) :
+    url = info['url']
+    name = info['name']
+
+    # building the client asks the service for its identity, a service
+    # redeployed at the same URL has a new enclave and is created again
+    eservice_client = ServiceClientRegistry.open(config).eservice_client(url, fresh=True)
+    if url in eservices.urls() :
+        eservice = eservices.get_by_url(url)
+        if eservice.name == name and eservice.enclave_id == eservice_client.enclave_id :
+            return 'unchanged'
+
+    eservice = EnclaveService.create(config, url, name, eservice_client)
+    if eservice is None :
+        raise Exception('failed to create the enclave service')
+    return 'created'
+
+# -----------------------------------------------------------------
+# -----------------------------------------------------------------
+def RegisterPService(config, pservices, info) :
+    url = info['url']
+    name = info['name']
+
+    # building the client asks the service for its identity
+    pservice_client = ServiceClientRegistry.open(config).pservice_client(url, fresh=True)
+    if url in pservices.urls() :
+        pservice = pservices.get_by_url(url)
+        if pservice.name == name and pservice.service_id == pservice_client.verifying_key :
+            return 'unchanged'
+
+    pservice = ProvisioningService.create(config, url, name, pservice_client)
+    if pservice is None :
+        raise Exception('failed to create the provisioning service')
+    return 'created'
 
+# -----------------------------------------------------------------
+# -----------------------------------------------------------------
+def RegisterContractCode(config, codes, info) :
+    code_file = info['file']
+    contract_name = info['contract']
+
+    code_hasher = hashlib.sha256()
+    with open(code_file, "rb") as cf :
+        for chunk in iter(lambda : cf.read(ContractCode.__chunk_size__), b'') :
+            code_hasher.update(chunk)
+    code_hash = code_hasher.hexdigest()[:16]
+
+    if code_hash in codes.hashes() and codes.get_by_hash(code_hash).name == contract_name :
+        return 'unchanged'
+
+    with open(code_file, "rb") as cf :
+        ccode = ContractCode.create(config, cf, contract_name)
+    if ccode is None :
+        raise Exception('failed to import contract code')
+    return 'created'
+
+# -----------------------------------------------------------------
+# -----------------------------------------------------------------
+def LocalMain(config, data, threads, timeout) :
+    # the stored services and code are loaded once and used to skip
+    # entries that are already registered
+    eservices = EnclaveServiceList.load(config)
+    pservices = ProvisioningServiceList.load(config)
+    codes = ContractCodeList.load(config)
+
+    registrations = []
+    for info in data.get('EService', []) :
+        registrations.append(('EService', info.get('name'), RegisterEService, eservices, info))
+    for info in data.get('PService', []) :
+        registrations.append(('PService', info.get('name'), RegisterPService, pservices, info))
     for info in data.get('ContractCode', []) :
-        try :
-            code_file = info['file']
-            contract_name = info['contract']
-        except KeyError as ke :
-            logger.error('missing required contract code data field %s', str(ke))
-            continue
+        registrations.append(('ContractCode', info.get('contract'), RegisterContractCode, codes, info))
 
+    def register(kind, name, function, existing, info) :
+        start = time.time()
         try :
-            with open(code_file, "rb") as cf :
-                pservice = ContractCode.create(config, cf, contract_name)
+            status = RunWithTimeout(lambda : function(config, existing, info), timeout)
+        except KeyError as ke :
+            logger.error('missing required %s data field %s', kind, str(ke))
+            status = 'failed'
         except Exception as e :
-            logger.error('failed to import contract code; %s', str(e))
-            continue
+            logger.error('failed to register %s %s; %s', kind, name, str(e))
+            status = 'failed'
+        return (kind, name, status, time.time() - start)
 
-    sys.exit(0)
+    start = time.time()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=threads) as executor :
+        futures = [executor.submit(register, *r) for r in registrations]
+        results = [f.result() for f in futures]
+    elapsed = time.time() - start
+
+    summary = {}
+    for (kind, name, status, item_time) in results :
+        logger.debug('%s %s %s in %.2f seconds', kind, name, status, item_time)
+        counts = summary.setdefault(kind, { 'created' : 0, 'unchanged' : 0, 'failed' : 0, 'time' : 0.0 })
+        counts[status] += 1
+        counts['time'] = max(counts['time'], item_time)
+
+    for kind in ['EService', 'PService', 'ContractCode'] :
+        if kind in summary :
+            counts = summary[kind]
+            logger.info('%s: %d created, %d unchanged, %d failed; slowest %.2f seconds',
+                        kind, counts['created'], counts['unchanged'], counts['failed'], counts['time'])
+    logger.info('%d entries processed in %.2f seconds', len(results), elapsed)
+
+    failed = sum(map(lambda c : c['failed'], summary.values()))
+    sys.exit(0 if failed == 0 else 1)
 
 ## XXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXX
 ## XXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXX
@@ -114,6 +204,9 @@ def Main() :
 
     parser.add_argument('--data', help='configuration file with services to add', nargs = '+', required = True)
 
+    parser.add_argument('--threads', help='Number of registrations to run concurrently', default = 8, type = int)
+    parser.add_argument('--timeout', help='Seconds allowed for each registration', default = 60, type = float)
+
     parser.add_argument('--identity', help='Identity to use for the process', required = True, type = str)
 
     parser.add_argument('--logfile', help='Name of the log file, __screen__ for standard output', type=str)
@@ -159,7 +252,7 @@ def Main() :
     sys.stderr = plogger.stream_to_logger(logging.getLogger('STDERR'), logging.WARN)
 
     # GO!
-    LocalMain(config, data)
+    LocalMain(config, data, max(1, options.threads), options.timeout)
 
 ## -----------------------------------------------------------------
 ## Entry points
@@ -0,0 +1,227 @@
+#!/usr/bin/env python
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import argparse
+import concurrent.futures
+import json
+import os
+import sys
+import time
+
+import pdo.common.config as pconfig
+import pdo.common.logger as plogger
+
+from toxaway.contract.create import Create
+from toxaway.models.contract_code import ContractCodeList
+from toxaway.models.eservice import EnclaveServiceList
+from toxaway.models.profile import Profile
+from toxaway.models.pservice import ProvisioningServiceList
+
+import logging
+logger = logging.getLogger(__name__)
+
+# -----------------------------------------------------------------
+# -----------------------------------------------------------------
+def SelectServices(services, selected, service_list) :
+    """pick the services named by URL or by name from the list, all of
+    them if none are named
+    """
+    if not selected :
+        return services
+
+    by_name = dict(map(lambda s : (s.name, s), services))
+    for reference in selected :
+        try :
+            service = services.get_by_url(reference)
+        except KeyError :
+            service = by_name.get(reference)
+        if service is None :
+            raise Exception('unknown service {0}'.format(reference))
+        service_list.add(service)
+
+    return service_list
+
+# -----------------------------------------------------------------
+# -----------------------------------------------------------------
+def CreateOne(config, profile, info, code_list, eservices, pservices) :
+    start = time.time()
+    result = { 'name' : info.get('name'), 'contract_id' : None, 'status' : 'failed', 'error' : None }
+
+    try :
+        name = info['name']
+        code_name = info['code']
+
+        try :
+            contract_code = code_list.get_by_name(code_name)
+        except KeyError :
+            contract_code = code_list.get_by_hash(code_name)
+
+        contract_eservices = SelectServices(eservices, info.get('eservices'), EnclaveServiceList(config))
+        contract_pservices = SelectServices(pservices, info.get('pservices'), ProvisioningServiceList(config))
+
+        contract = Create(config, profile, name, contract_code, contract_eservices, contract_pservices)
+        if contract is None :
+            raise Exception('failed to create the contract, see the log for details')
+
+        result['contract_id'] = contract.contract_id
+        result['status'] = 'created'
+    except KeyError as ke :
+        result['error'] = 'missing or unknown contract field {0}'.format(str(ke))
+    except Exception as e :
+        result['error'] = str(e)
+
+    result['elapsed'] = time.time() - start
+    if result['error'] :
+        logger.warn('failed to create contract %s; %s', result['name'], result['error'])
+    else :
+        logger.info('created contract %s in %.2f seconds', result['name'], result['elapsed'])
+
+    return result
+
+# -----------------------------------------------------------------
+# -----------------------------------------------------------------
+def LocalMain(config, data, profile_name, password, threads, report_file) :
+    """create the contracts listed in the manifest, each entry looks like
+
+    [[Contract]]
+    name = "issuer-acme"
+    code = "issuer-contract"    # contract code name or code hash
+    eservices = [ "http://localhost:7101" ]   # URLs or names, all if omitted
+    pservices = [ "http://localhost:7001" ]   # URLs or names, all if omitted
+    """
+    profile = Profile.load(config, profile_name, password)
+    if profile is None :
+        logger.error('failed to load profile %s', profile_name)
+        sys.exit(-1)
+
+    # the lists, code objects and service clients are shared by all contracts
+    code_list = ContractCodeList.load(config)
+    eservices = EnclaveServiceList.load(config)
+    pservices = ProvisioningServiceList.load(config)
+
+    contracts = data.get('Contract', [])
+    logger.info('create %d contracts with %d threads', len(contracts), threads)
+
+    start = time.time()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=threads) as executor :
+        futures = []
+        for info in contracts :
+            futures.append(executor.submit(CreateOne, config, profile, info, code_list, eservices, pservices))
+        results = [f.result() for f in futures]
+    elapsed = time.time() - start
+
+    created = len([r for r in results if r['status'] == 'created'])
+    logger.info('created %d of %d contracts in %.2f seconds', created, len(results), elapsed)
+
+    if report_file :
+        report = { 'created' : created, 'failed' : len(results) - created, 'elapsed' : elapsed, 'contracts' : results }
+        with open(report_file, "w") as rf :
+            json.dump(report, rf, indent=2)
+        logger.info('report written to %s', report_file)
+
+    sys.exit(0 if created == len(results) else 1)
+
+## XXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXX
+## XXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXX
+
+## -----------------------------------------------------------------
+ContractHost = os.environ.get("HOSTNAME", "localhost")
+ContractHome = os.environ.get("PDO_HOME") or os.path.realpath("/opt/pdo")
+ContractEtc = os.path.join(ContractHome, "etc")
+ContractKeys = os.path.join(ContractHome, "keys")
+ContractLogs = os.path.join(ContractHome, "logs")
+ContractData = os.path.join(ContractHome, "data")
+LedgerURL = os.environ.get("PDO_LEDGER_URL", "http://127.0.0.1:8008/")
+ScriptBase = os.path.splitext(os.path.basename(sys.argv[0]))[0]
+
+config_map = {
+    'base' : ScriptBase,
+    'data' : ContractData,
+    'etc'  : ContractEtc,
+    'home' : ContractHome,
+    'host' : ContractHost,
+    'keys' : ContractKeys,
+    'logs' : ContractLogs,
+    'ledger' : LedgerURL
+}
+
+# -----------------------------------------------------------------
+# -----------------------------------------------------------------
+def Main() :
+    # parse out the configuration file first
+    conffiles = [ 'toxaway.toml' ]
+    confpaths = [ ".", "./etc", ContractEtc ]
+
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument('--config', help='configuration file', nargs = '+')
+    parser.add_argument('--config-dir', help='directory to search for configuration files', nargs = '+')
+
+    parser.add_argument('--manifest', help='configuration file with contracts to create', nargs = '+', required = True)
+    parser.add_argument('--profile', help='Name of the profile that creates the contracts', required = True, type = str)
+    parser.add_argument('--password', help='Password for the profile', required = True, type = str)
+    parser.add_argument('--threads', help='Number of contracts to create concurrently', default = 4, type = int)
+    parser.add_argument('--report', help='Name of the file for the json report', type = str)
+
+    parser.add_argument('--identity', help='Identity to use for the process', required = True, type = str)
+
+    parser.add_argument('--logfile', help='Name of the log file, __screen__ for standard output', type=str)
+    parser.add_argument('--loglevel', help='Logging level', type=str)
+
+    options = parser.parse_args()
+
+    # first process the options necessary to load the default configuration
+    if options.config :
+        conffiles = options.config
+
+    if options.config_dir :
+        confpaths = options.config_dir
+
+    global config_map
+    config_map['identity'] = options.identity
+
+    try :
+        config = pconfig.parse_configuration_files(conffiles, confpaths, config_map)
+    except pconfig.ConfigurationException as e :
+        logger.error(str(e))
+        sys.exit(-1)
+
+    try :
+        data = pconfig.parse_configuration_files(options.manifest, confpaths, config_map)
+    except pconfig.ConfigurationException as e :
+        logger.error(str(e))
+        sys.exit(-1)
+
+    # set up the logging configuration
+    if config.get('Logging') is None :
+        config['Logging'] = {
+            'LogFile' : '__screen__',
+            'LogLevel' : 'INFO'
+        }
+    if options.logfile :
+        config['Logging']['LogFile'] = options.logfile
+    if options.loglevel :
+        config['Logging']['LogLevel'] = options.loglevel.upper()
+
+    plogger.setup_loggers(config.get('Logging', {}))
+    sys.stdout = plogger.stream_to_logger(logging.getLogger('STDOUT'), logging.DEBUG)
+    sys.stderr = plogger.stream_to_logger(logging.getLogger('STDERR'), logging.WARN)
+
+    # GO!
+    LocalMain(config, data, options.profile, options.password, max(1, options.threads), options.report)
+
+## -----------------------------------------------------------------
+## Entry points
+## -----------------------------------------------------------------
+Main()
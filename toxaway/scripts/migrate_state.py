@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import argparse
+import os
+import sys
+
+import pdo.common.config as pconfig
+import pdo.common.logger as plogger
+from pdo.contract.state import ContractState as pdo_contract_state
+
+from toxaway.models.state import StateCache
+
+import logging
+logger = logging.getLogger(__name__)
+
+# -----------------------------------------------------------------
+# -----------------------------------------------------------------
+def LocalMain(config, compression, dry_run) :
+    # only the state files in pdo's cache directory are rewritten, the
+    # State root is usually the whole pdo data directory
+    cache_directory = StateCache.open(config).cache_directory
+
+    migrated = 0
+    bytes_before = 0
+    bytes_after = 0
+    for base, dirs, files in os.walk(cache_directory) :
+        for file_name in files :
+            if not file_name.endswith(pdo_contract_state.__extension__) :
+                continue
+
+            file_name = os.path.join(base, file_name)
+            try :
+                if dry_run :
+                    with open(file_name, "rb") as sf :
+                        data = sf.read()
+                    sizes = None
+                    if not data.startswith(StateCache.__marker__) and b'EncryptedState' in data :
+                        sizes = (len(data), len(data))
+                else :
+                    sizes = StateCache.migrate_file(file_name, compression)
+            except Exception as e :
+                logger.warn('failed to migrate state file %s; %s', file_name, str(e))
+                continue
+
+            if sizes is None :
+                continue
+
+            migrated += 1
+            bytes_before += sizes[0]
+            bytes_after += sizes[1]
+
+    if dry_run :
+        logger.info('%d state files would be migrated, %d bytes', migrated, bytes_before)
+    else :
+        logger.info('migrated %d state files from %d to %d bytes, saved %d bytes',
+                    migrated, bytes_before, bytes_after, bytes_before - bytes_after)
+
+    sys.exit(0)
+
+## XXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXX
+## XXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXX
+
+## -----------------------------------------------------------------
+ContractHost = os.environ.get("HOSTNAME", "localhost")
+ContractHome = os.environ.get("PDO_HOME") or os.path.realpath("/opt/pdo")
+ContractEtc = os.path.join(ContractHome, "etc")
+ContractKeys = os.path.join(ContractHome, "keys")
+ContractLogs = os.path.join(ContractHome, "logs")
+ContractData = os.path.join(ContractHome, "data")
+LedgerURL = os.environ.get("PDO_LEDGER_URL", "http://127.0.0.1:8008/")
+ScriptBase = os.path.splitext(os.path.basename(sys.argv[0]))[0]
+
+config_map = {
+    'base' : ScriptBase,
+    'data' : ContractData,
+    'etc'  : ContractEtc,
+    'home' : ContractHome,
+    'host' : ContractHost,
+    'keys' : ContractKeys,
+    'logs' : ContractLogs,
+    'ledger' : LedgerURL
+}
+
+# -----------------------------------------------------------------
+# -----------------------------------------------------------------
+def Main() :
+    # parse out the configuration file first
+    conffiles = [ 'toxaway.toml' ]
+    confpaths = [ ".", "./etc", ContractEtc ]
+
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument('--config', help='configuration file', nargs = '+')
+    parser.add_argument('--config-dir', help='directory to search for configuration files', nargs = '+')
+
+    parser.add_argument('--identity', help='Identity to use for the process', required = True, type = str)
+
+    parser.add_argument('--compression', help='Compression method', choices = ['zlib', 'lzma'], type = str)
+    parser.add_argument('--dry-run', help='Report the files to migrate without changing them', action = 'store_true')
+
+    parser.add_argument('--logfile', help='Name of the log file, __screen__ for standard output', type=str)
+    parser.add_argument('--loglevel', help='Logging level', type=str)
+
+    options = parser.parse_args()
+
+    # first process the options necessary to load the default configuration
+    if options.config :
+        conffiles = options.config
+
+    if options.config_dir :
+        confpaths = options.config_dir
+
+    global config_map
+    config_map['identity'] = options.identity
+
+    try :
+        config = pconfig.parse_configuration_files(conffiles, confpaths, config_map)
+    except pconfig.ConfigurationException as e :
+        logger.error(str(e))
+        sys.exit(-1)
+
+    # set up the logging configuration
+    if config.get('Logging') is None :
+        config['Logging'] = {
+            'LogFile' : '__screen__',
+            'LogLevel' : 'INFO'
+        }
+    if options.logfile :
+        config['Logging']['LogFile'] = options.logfile
+    if options.loglevel :
+        config['Logging']['LogLevel'] = options.loglevel.upper()
+
+    plogger.setup_loggers(config.get('Logging', {}))
+    sys.stdout = plogger.stream_to_logger(logging.getLogger('STDOUT'), logging.DEBUG)
+    sys.stderr = plogger.stream_to_logger(logging.getLogger('STDERR'), logging.WARN)
+
+    compression = options.compression or config.get('Cache', {}).get('StateCompression', 'zlib')
+
+    # GO!
+    LocalMain(config, compression, options.dry_run)
+
+## -----------------------------------------------------------------
+## Entry points
+## -----------------------------------------------------------------
+Main()
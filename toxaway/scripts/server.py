@@ -24,6 +24,9 @@ import pdo.common.logger as plogger
 import pdo.service_client.service_data.eservice as eservice_db
 from pdo.contract.response import ContractResponse
 import toxaway.views
+from toxaway.models.clients import ServiceClientRegistry
+from toxaway.models.commits import CommitManager
+from toxaway.models.jobs import InvocationQueue
 
 import logging
 logger = logging.getLogger(__name__)
@@ -105,6 +108,9 @@ def StartService(config) :
 
     logger.info('service started on host %s, port %s', http_host, http_port)
 
+    # shared clients for the enclave and provisioning services
+    ServiceClientRegistry.open(config)
+
     thread_pool = ThreadPool(maxthreads=worker_threads)
     thread_pool.start()
     reactor.addSystemEventTrigger('before', 'shutdown', thread_pool.stop)
@@ -141,6 +147,8 @@ def RunService() :
     reactor.addSystemEventTrigger('before', 'shutdown', shutdown_twisted)
 
     atexit.register(lambda : ContractResponse.exit_commit_workers())
+    atexit.register(lambda : CommitManager.shutdown())
+    atexit.register(lambda : InvocationQueue.shutdown())
 
     try :
         reactor.run()
@@ -20,6 +20,7 @@ import toxaway.views.eservice
 import toxaway.views.index
 import toxaway.views.login
 import toxaway.views.pservice
+import toxaway.views.statistics
 
 def register(config) :
     try :
@@ -38,5 +39,6 @@ def register(config) :
     toxaway.views.index.register(app, config)
     toxaway.views.login.register(app, config)
     toxaway.views.pservice.register(app, config)
+    toxaway.views.statistics.register(app, config)
 
     return app
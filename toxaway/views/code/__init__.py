@@ -13,6 +13,7 @@
 # limitations under the License.
 
 from toxaway.views.code.add_app import add_contract_code_app
+from toxaway.views.code.list_app import list_contract_code_app
 from toxaway.views.code.pick_app import pick_contract_code_app
 from toxaway.views.code.view_app import view_contract_code_app
 
@@ -26,5 +27,6 @@ __all__ = [ 'register' ]
 def register(app, config) :
     logging.info('register code apps')
     app.add_url_rule('/code/pick', None, pick_contract_code_app(config), methods=['GET', 'POST'])
+    app.add_url_rule('/code/list', None, list_contract_code_app(config), methods=['GET'])
     app.add_url_rule('/code/add', None, add_contract_code_app(config), methods=['GET', 'POST'])
     app.add_url_rule('/code/view/<code_hash>', None, view_contract_code_app(config), methods=['GET'])
@@ -21,6 +21,7 @@ from wtforms.validators import DataRequired, URL
 
 from toxaway.models.profile import Profile
 from toxaway.models.contract_code import ContractCode, ContractCodeList
+from toxaway.views.paging import page_arguments
 
 import logging
 logger = logging.getLogger(__name__)
@@ -45,8 +46,17 @@ class pick_contract_code_app(object) :
             logger.info('missing required profile')
             return redirect(url_for('login_app'))
 
-        code_list = ContractCodeList.load(self.config)
-        if code_list.count == 0 :
+        (filters, cursor, limit) = page_arguments(self.config, 'prefix', 'code_hash')
+        try :
+            (code_list, next_cursor) = ContractCodeList.load_page(
+                self.config, name_prefix=filters.get('prefix'), code_hash=filters.get('code_hash'),
+                cursor=cursor, limit=limit)
+        except ValueError as e :
+            logger.info('invalid page request; %s', str(e))
+            flash('invalid page request')
+            return render_template('error.html', title='An Error Occurred', profile=profile)
+
+        if code_list.count == 0 and not filters and not cursor :
             return redirect(url_for('add_contract_code_app'))
 
         form = __Pick_Contract_Code_Form__()
@@ -70,4 +80,6 @@ class pick_contract_code_app(object) :
                                    profile=profile)
         else :
             logger.debug('ERRORS: %s', form.errors)
-            return render_template('contract_code/pick.html', title='Pick Contract Code', form=form, profile=profile)
+            return render_template('contract_code/pick.html', title='Pick Contract Code', form=form, profile=profile,
+                                   page_endpoint='pick_contract_code_app', filter_names=['prefix', 'code_hash'],
+                                   filters=filters, next_cursor=next_cursor)
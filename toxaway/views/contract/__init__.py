@@ -12,10 +12,14 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from toxaway.views.contract.batch_app import contract_batch_app
 from toxaway.views.contract.create_app import contract_create_app
 from toxaway.views.contract.import_app import contract_import_app
 from toxaway.views.contract.invoke_app import contract_invoke_app
+from toxaway.views.contract.job_app import contract_submit_app, contract_job_app
+from toxaway.views.contract.list_app import contract_list_app
 from toxaway.views.contract.pick_app import contract_pick_app
+from toxaway.views.contract.query_app import contract_query_app
 from toxaway.views.contract.set_preferences_app import set_preferences_app
 from toxaway.views.contract.view_app import contract_view_app
 
@@ -30,7 +34,12 @@ def register(app, config) :
     logging.info('register contract creation')
     app.add_url_rule('/contract/create', None, contract_create_app(config), methods=['GET', 'POST'])
     app.add_url_rule('/contract/pick', None, contract_pick_app(config), methods=['GET', 'POST'])
+    app.add_url_rule('/contract/list', None, contract_list_app(config), methods=['GET'])
     app.add_url_rule('/contract/import', None, contract_import_app(config), methods=['GET', 'POST'])
     app.add_url_rule('/contract/view/<contract_id>', None, contract_view_app(config), methods=['GET'])
     app.add_url_rule('/contract/invoke/<contract_id>', None, contract_invoke_app(config), methods=['GET', 'POST'])
+    app.add_url_rule('/contract/query/<contract_id>', None, contract_query_app(config), methods=['GET', 'POST'])
+    app.add_url_rule('/contract/batch/<contract_id>', None, contract_batch_app(config), methods=['POST'])
+    app.add_url_rule('/contract/submit/<contract_id>', None, contract_submit_app(config), methods=['POST'])
+    app.add_url_rule('/contract/job/<job_id>', None, contract_job_app(config), methods=['GET'])
     app.add_url_rule('/contract/preferences/<contract_id>', None, set_preferences_app(config), methods=['GET', 'POST'])
@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from flask import jsonify, request, session
+
+from toxaway.models.profile import Profile
+from toxaway.models.contract import Contract
+from toxaway.models.response import ContractResponse
+
+import logging
+logger = logging.getLogger(__name__)
+
+__all__ = ['contract_batch_app']
+
+## ----------------------------------------------------------------
+## ----------------------------------------------------------------
+class contract_batch_app(object) :
+    """evaluate an ordered list of expressions against one contract,
+    the request is json with an expressions list and an optional
+    stop_on_error flag
+    """
+
+    def __init__(self, config) :
+        self.__name__ = type(self).__name__
+        self.config = config
+        self.max_batch_size = config.get('Service', {}).get('MaxBatchSize', 100)
+
+    def __call__(self, contract_id, *args) :
+        # any update to the data store must be in the context of an authorized profile
+        profile = Profile.load(self.config, session.get('profile_name',''), session.get('profile_secret',''))
+        if profile is None :
+            logger.info('missing required profile')
+            return jsonify({ 'error' : 'missing required profile' }), 401
+
+        params = request.get_json(silent=True) or {}
+        expressions = params.get('expressions')
+        if not isinstance(expressions, list) or not expressions :
+            return jsonify({ 'error' : 'missing expressions' }), 400
+        if len(expressions) > self.max_batch_size :
+            return jsonify({ 'error' : 'too many expressions; limit is {0}'.format(self.max_batch_size) }), 400
+
+        contract = Contract.load(self.config, contract_id, use_raw=False)
+        if contract is None :
+            logger.info('no such contract')
+            return jsonify({ 'error' : 'failed to find contract' }), 404
+
+        stop_on_error = bool(params.get('stop_on_error', False))
+        results = ContractResponse.invoke_batch(self.config, profile, contract, expressions, stop_on_error)
+
+        items = []
+        for (expression, (response, error)) in zip(expressions, results) :
+            items.append({
+                'expression' : expression,
+                'result' : None if response is None else str(response),
+                'error' : error,
+            })
+
+        return jsonify({ 'results' : items })
@@ -19,6 +19,7 @@ from wtforms import StringField, SubmitField
 from wtforms.validators import DataRequired, URL
 
 from toxaway.models.profile import Profile
+from toxaway.models.commits import CommitQueueFullException
 from toxaway.models.contract import Contract
 from toxaway.models.eservice import EnclaveService
 from toxaway.models.response import ContractResponse, InvocationException
@@ -33,6 +34,7 @@ __all__ = ['contract_invoke_app']
 class __Contract_Invoke_Form__(FlaskForm) :
     expression = StringField('Expression')
     submit = SubmitField('Submit')
+    query = SubmitField('Query')
 
 ## ----------------------------------------------------------------
 ## ----------------------------------------------------------------
@@ -62,11 +64,18 @@ class contract_invoke_app(object) :
         if form.validate_on_submit() :
             try :
                 expression = form.expression.data
-                response = ContractResponse.invoke_method(self.config, profile, contract, expression)
+                if form.query.data :
+                    response = ContractResponse.query_method(self.config, profile, contract, expression)
+                else :
+                    response = ContractResponse.invoke_method(self.config, profile, contract, expression)
             except InvocationException as e :
                 logger.info('invocation failed: %s', str(e))
                 return render_template('contract/invoke.html', title='Invocation Results',
                                        contract=contract, form=form, profile=profile, result=None, error=str(e))
+            except CommitQueueFullException as e :
+                logger.info('invocation rejected: %s', str(e))
+                return render_template('contract/invoke.html', title='Invocation Results',
+                                       contract=contract, form=form, profile=profile, result=None, error=str(e)), 503
 
             logger.info("response is %s", str(response))
             return render_template('contract/invoke.html', title='Invocation Results',
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from flask import jsonify, request, session
+
+from toxaway.models.profile import Profile
+from toxaway.models.contract import Contract
+from toxaway.models.jobs import InvocationJob, InvocationQueue, QueueFullException
+from toxaway.models.response import ContractResponse
+
+import logging
+logger = logging.getLogger(__name__)
+
+__all__ = ['contract_submit_app', 'contract_job_app']
+
+# longest time a request may wait for a job to finish
+MaximumWaitTime = 30
+
+## ----------------------------------------------------------------
+## ----------------------------------------------------------------
+def __load_profile__(config) :
+    return Profile.load(config, session.get('profile_name',''), session.get('profile_secret',''))
+
+## ----------------------------------------------------------------
+## ----------------------------------------------------------------
+class contract_submit_app(object) :
+    """queue a method invocation and return the job that will carry
+    it out; the result is collected from contract_job_app
+    """
+
+    def __init__(self, config) :
+        self.__name__ = type(self).__name__
+        self.config = config
+
+    def __call__(self, contract_id, *args) :
+        # any update to the data store must be in the context of an authorized profile
+        profile = __load_profile__(self.config)
+        if profile is None :
+            logger.info('missing required profile')
+            return jsonify({ 'error' : 'missing required profile' }), 401
+
+        params = request.get_json(silent=True) or request.form
+        expression = params.get('expression')
+        if not expression :
+            return jsonify({ 'error' : 'missing expression' }), 400
+
+        contract = Contract.load(self.config, contract_id, use_raw=False)
+        if contract is None :
+            logger.info('no such contract')
+            return jsonify({ 'error' : 'failed to find contract' }), 404
+
+        config = self.config
+        def invoke() :
+            return str(ContractResponse.invoke_method(config, profile, contract, expression))
+
+        job = InvocationJob(profile.name, contract_id, expression)
+        try :
+            InvocationQueue.open(self.config).submit(job, invoke)
+        except QueueFullException as e :
+            logger.info('invocation rejected; %s', str(e))
+            return jsonify({ 'error' : str(e) }), 503
+
+        logger.info('queued job %s for contract %s', job.job_id, contract_id)
+        return jsonify(job.serialize()), 202
+
+## ----------------------------------------------------------------
+## ----------------------------------------------------------------
+class contract_job_app(object) :
+    """report the status of a job, with the wait parameter the request
+    blocks for up to that many seconds until the job finishes
+    """
+
+    def __init__(self, config) :
+        self.__name__ = type(self).__name__
+        self.config = config
+
+    def __call__(self, job_id, *args) :
+        profile = __load_profile__(self.config)
+        if profile is None :
+            logger.info('missing required profile')
+            return jsonify({ 'error' : 'missing required profile' }), 401
+
+        job = InvocationQueue.open(self.config).get(job_id)
+        if job is None or job.owner != profile.name :
+            return jsonify({ 'error' : 'unknown job' }), 404
+
+        try :
+            wait = float(request.args.get('wait', 0))
+        except ValueError :
+            wait = 0
+
+        if wait > 0 :
+            job.wait(min(wait, MaximumWaitTime))
+
+        return jsonify(job.serialize())
@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from flask import jsonify, session
+
+from toxaway.models.profile import Profile
+from toxaway.models.contract import ContractList
+from toxaway.views.paging import page_arguments, page_response
+
+import logging
+logger = logging.getLogger(__name__)
+
+## ----------------------------------------------------------------
+## ----------------------------------------------------------------
+class contract_list_app(object) :
+    def __init__(self, config) :
+        self.__name__ = type(self).__name__
+        self.config = config
+
+    def __call__(self, *args) :
+        # any access to the data store must be in the context of an authorized profile
+        profile = Profile.load(self.config, session.get('profile_name',''), session.get('profile_secret',''))
+        if profile is None :
+            logger.info('missing required profile')
+            return jsonify({ 'error' : 'missing required profile' }), 401
+
+        (filters, cursor, limit) = page_arguments(self.config, 'prefix', 'creator', 'code_hash')
+        try :
+            (contract_list, next_cursor) = ContractList.load_page(
+                self.config, name_prefix=filters.get('prefix'), creator=filters.get('creator'),
+                code_hash=filters.get('code_hash'), cursor=cursor, limit=limit)
+        except ValueError as e :
+            logger.info('invalid page request; %s', str(e))
+            return jsonify({ 'error' : str(e) }), 400
+
+        items = []
+        for summary in contract_list :
+            items.append({
+                'contract_id' : summary.contract_id,
+                'safe_contract_id' : summary.safe_contract_id,
+                'name' : summary.name,
+                'creator_id' : summary.creator_id,
+                'code_name' : summary.code_name,
+                'code_hash' : summary.code_hash,
+            })
+
+        return page_response(items, next_cursor)
@@ -21,6 +21,7 @@ from wtforms.validators import DataRequired, URL
 
 from toxaway.models.profile import Profile
 from toxaway.models.contract import ContractList, Contract, LedgerContract
+from toxaway.views.paging import page_arguments
 
 import logging
 logger = logging.getLogger(__name__)
@@ -47,8 +48,17 @@ class contract_pick_app(object) :
             logger.info('missing required profile')
             return redirect(url_for('login_app'))
 
-        contract_list = ContractList.load(self.config)
-        if contract_list.count == 0 :
+        (filters, cursor, limit) = page_arguments(self.config, 'prefix', 'creator', 'code_hash')
+        try :
+            (contract_list, next_cursor) = ContractList.load_page(
+                self.config, name_prefix=filters.get('prefix'), creator=filters.get('creator'),
+                code_hash=filters.get('code_hash'), cursor=cursor, limit=limit)
+        except ValueError as e :
+            logger.info('invalid page request; %s', str(e))
+            flash('invalid page request')
+            return render_template('error.html', title='An Error Occurred', profile=profile)
+
+        if contract_list.count == 0 and not filters and not cursor :
             return redirect(url_for('contract_import_app'))
 
         form = __Pick_Contract_Form__()
@@ -64,4 +74,6 @@ class contract_pick_app(object) :
             return redirect(url_for('contract_view_app', contract_id=contract_id))
         else :
             logger.info('ERRORS: %s', form.errors)
-            return render_template('contract/pick.html', title='Pick Contract', form=form, profile=profile)
+            return render_template('contract/pick.html', title='Pick Contract', form=form, profile=profile,
+                                   page_endpoint='contract_pick_app', filter_names=['prefix', 'creator', 'code_hash'],
+                                   filters=filters, next_cursor=next_cursor)
@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from flask import jsonify, request, session
+
+from toxaway.models.profile import Profile
+from toxaway.models.contract import Contract
+from toxaway.models.response import ContractResponse, InvocationException
+
+import logging
+logger = logging.getLogger(__name__)
+
+__all__ = ['contract_query_app']
+
+## ----------------------------------------------------------------
+## ----------------------------------------------------------------
+class contract_query_app(object) :
+    """evaluate a read only expression on the contract invoke enclave,
+    the expression (and optionally hedge) is passed in the query string
+    or as json
+    """
+
+    def __init__(self, config) :
+        self.__name__ = type(self).__name__
+        self.config = config
+
+    def __call__(self, contract_id, *args) :
+        profile = Profile.load(self.config, session.get('profile_name',''), session.get('profile_secret',''))
+        if profile is None :
+            logger.info('missing required profile')
+            return jsonify({ 'error' : 'missing required profile' }), 401
+
+        params = request.get_json(silent=True) or request.values
+        expression = params.get('expression')
+        if not expression :
+            return jsonify({ 'error' : 'missing expression' }), 400
+
+        contract = Contract.load(self.config, contract_id, use_raw=False)
+        if contract is None :
+            logger.info('no such contract')
+            return jsonify({ 'error' : 'failed to find contract' }), 404
+
+        hedge = params.get('hedge')
+        if hedge is not None :
+            hedge = str(hedge).lower() in ('1', 'true', 'yes')
+
+        try :
+            response = ContractResponse.query_method(self.config, profile, contract, expression, hedge)
+        except InvocationException as e :
+            logger.info('query failed: %s', str(e))
+            return jsonify({ 'expression' : expression, 'result' : None, 'error' : str(e) })
+
+        return jsonify({ 'expression' : expression, 'result' : str(response), 'error' : None })
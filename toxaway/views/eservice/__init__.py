@@ -13,6 +13,7 @@
 # limitations under the License.
 
 from toxaway.views.eservice.add_app import add_eservice_app
+from toxaway.views.eservice.list_app import list_eservice_app
 from toxaway.views.eservice.pick_app import pick_eservice_app
 from toxaway.views.eservice.view_app import view_eservice_app
 
@@ -26,5 +27,6 @@ __all__ = [ 'register' ]
 def register(app, config) :
     logging.info('register auth apps')
     app.add_url_rule('/eservice/pick', None, pick_eservice_app(config), methods=['GET', 'POST'])
+    app.add_url_rule('/eservice/list', None, list_eservice_app(config), methods=['GET'])
     app.add_url_rule('/eservice/add', None, add_eservice_app(config), methods=['GET', 'POST'])
     app.add_url_rule('/eservice/view/<eservice_id>', None, view_eservice_app(config), methods=['GET'])
@@ -20,6 +20,7 @@ from wtforms.validators import DataRequired, URL
 
 from toxaway.models.profile import Profile
 from toxaway.models.eservice import EnclaveService, EnclaveServiceList
+from toxaway.views.paging import page_arguments
 
 import logging
 logger = logging.getLogger(__name__)
@@ -44,8 +45,16 @@ class pick_eservice_app(object) :
             logger.info('missing required profile')
             return redirect(url_for('login_app'))
 
-        eservice_list = EnclaveServiceList.load(self.config)
-        if eservice_list.count == 0 :
+        (filters, cursor, limit) = page_arguments(self.config, 'prefix')
+        try :
+            (eservice_list, next_cursor) = EnclaveServiceList.load_page(
+                self.config, name_prefix=filters.get('prefix'), cursor=cursor, limit=limit)
+        except ValueError as e :
+            logger.info('invalid page request; %s', str(e))
+            flash('invalid page request')
+            return render_template('error.html', title='An Error Occurred', profile=profile)
+
+        if eservice_list.count == 0 and not filters and not cursor :
             return redirect(url_for('add_eservice_app'))
 
         form = __Pick_Enclave_Service_Form__()
@@ -60,4 +69,6 @@ class pick_eservice_app(object) :
             return redirect(url_for('view_eservice_app', eservice_id=form.eservice_list.data))
         else :
             logger.debug('ERRORS: %s', form.errors)
-            return render_template('eservice/pick.html', title='Pick EService', form=form, profile=profile)
+            return render_template('eservice/pick.html', title='Pick EService', form=form, profile=profile,
+                                   page_endpoint='pick_eservice_app', filter_names=['prefix'],
+                                   filters=filters, next_cursor=next_cursor)
@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from flask import jsonify, request
+
+import logging
+logger = logging.getLogger(__name__)
+
+__all__ = [ 'page_arguments', 'page_response' ]
+
+MaximumPageSize = 500
+
+## ----------------------------------------------------------------
+## ----------------------------------------------------------------
+def page_arguments(config, *filter_names) :
+    """pull the named filters, the cursor and the page size from the
+    query string; returns (filters, cursor, limit)
+    """
+    filters = {}
+    for filter_name in filter_names :
+        value = request.args.get(filter_name)
+        if value :
+            filters[filter_name] = value
+
+    cursor = request.args.get('cursor') or None
+
+    limit = config.get('Service', {}).get('PageSize', 50)
+    try :
+        limit = int(request.args.get('limit', limit))
+    except ValueError :
+        pass
+
+    return (filters, cursor, max(1, min(limit, MaximumPageSize)))
+
+## ----------------------------------------------------------------
+## ----------------------------------------------------------------
+def page_response(items, next_cursor) :
+    """generate the json response for one page of a listing
+    """
+    return jsonify({ 'items' : items, 'cursor' : next_cursor })
@@ -13,6 +13,7 @@
 # limitations under the License.
 
 from toxaway.views.pservice.add_app import add_pservice_app
+from toxaway.views.pservice.list_app import list_pservice_app
 from toxaway.views.pservice.pick_app import pick_pservice_app
 from toxaway.views.pservice.view_app import view_pservice_app
 
@@ -26,5 +27,6 @@ __all__ = [ 'register' ]
 def register(app, config) :
     logging.info('register pservice apps')
     app.add_url_rule('/pservice/pick', None, pick_pservice_app(config), methods=['GET', 'POST'])
+    app.add_url_rule('/pservice/list', None, list_pservice_app(config), methods=['GET'])
     app.add_url_rule('/pservice/add', None, add_pservice_app(config), methods=['GET', 'POST'])
     app.add_url_rule('/pservice/view/<pservice_id>', None, view_pservice_app(config), methods=['GET'])
@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from flask import jsonify, session
+
+from toxaway.models.profile import Profile
+from toxaway.models.pservice import ProvisioningServiceList
+from toxaway.views.paging import page_arguments, page_response
+
+import logging
+logger = logging.getLogger(__name__)
+
+## ----------------------------------------------------------------
+## ----------------------------------------------------------------
+class list_pservice_app(object) :
+    def __init__(self, config) :
+        self.__name__ = type(self).__name__
+        self.config = config
+
+    def __call__(self, *args) :
+        # any access to the data store must be in the context of an authorized profile
+        profile = Profile.load(self.config, session.get('profile_name',''), session.get('profile_secret',''))
+        if profile is None :
+            logger.info('missing required profile')
+            return jsonify({ 'error' : 'missing required profile' }), 401
+
+        (filters, cursor, limit) = page_arguments(self.config, 'prefix')
+        try :
+            (pservice_list, next_cursor) = ProvisioningServiceList.load_page(
+                self.config, name_prefix=filters.get('prefix'), cursor=cursor, limit=limit)
+        except ValueError as e :
+            logger.info('invalid page request; %s', str(e))
+            return jsonify({ 'error' : str(e) }), 400
+
+        items = []
+        for pservice in pservice_list :
+            items.append({
+                'pservice_id' : pservice.file_name,
+                'service_id' : pservice.service_id,
+                'name' : pservice.name,
+                'url' : pservice.service_url,
+            })
+
+        return page_response(items, next_cursor)
@@ -20,6 +20,7 @@ from wtforms.validators import DataRequired, URL
 
 from toxaway.models.profile import Profile
 from toxaway.models.pservice import ProvisioningService, ProvisioningServiceList
+from toxaway.views.paging import page_arguments
 
 import logging
 logger = logging.getLogger(__name__)
@@ -46,8 +47,16 @@ class pick_pservice_app(object) :
             logger.info('missing required profile')
             return redirect(url_for('login_app'))
 
-        pservice_list = ProvisioningServiceList.load(self.config)
-        if pservice_list.count == 0 :
+        (filters, cursor, limit) = page_arguments(self.config, 'prefix')
+        try :
+            (pservice_list, next_cursor) = ProvisioningServiceList.load_page(
+                self.config, name_prefix=filters.get('prefix'), cursor=cursor, limit=limit)
+        except ValueError as e :
+            logger.info('invalid page request; %s', str(e))
+            flash('invalid page request')
+            return render_template('error.html', title='An Error Occurred', profile=profile)
+
+        if pservice_list.count == 0 and not filters and not cursor :
             return redirect(url_for('add_pservice_app'))
 
         form = __Pick_Provisioning_Service_Form__()
@@ -68,4 +77,6 @@ class pick_pservice_app(object) :
             return render_template('pservice/view.html', title='View Provisioning Service', pservice=pservice, profile=profile)
         else :
             logger.info('ERRORS: %s', form.errors)
-            return render_template('pservice/pick.html', title='Pick Provisioning Service', form=form, profile=profile)
+            return render_template('pservice/pick.html', title='Pick Provisioning Service', form=form, profile=profile,
+                                   page_endpoint='pick_pservice_app', filter_names=['prefix'],
+                                   filters=filters, next_cursor=next_cursor)
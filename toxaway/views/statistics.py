@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from flask import jsonify, session
+
+from toxaway.models.clients import ServiceClientRegistry
+from toxaway.models.commits import CommitManager
+from toxaway.models.contract import ContractRegistry
+from toxaway.models.contract_code import ContractCode
+from toxaway.models.hedging import RequestHedger
+from toxaway.models.jobs import InvocationQueue
+from toxaway.models.ledger import LedgerClient
+from toxaway.models.profile import Profile
+from toxaway.models.response import ContractResponse
+from toxaway.models.scheduler import EnclaveScheduler
+from toxaway.models.sequencer import ContractSequencer
+from toxaway.models.state import StateCache
+
+import logging
+logger = logging.getLogger(__name__)
+
+__all__ = [ 'register' ]
+
+## ----------------------------------------------------------------
+## ----------------------------------------------------------------
+class statistics_app(object) :
+    """report the operational statistics of the service as json
+    """
+
+    def __init__(self, config) :
+        self.__name__ = type(self).__name__
+        self.config = config
+
+    def __call__(self, *args) :
+        profile = Profile.load(self.config, session.get('profile_name',''), session.get('profile_secret',''))
+        if profile is None :
+            logger.info('missing required profile')
+            return jsonify({ 'error' : 'missing required profile' }), 401
+
+        statistics = dict()
+        statistics['clients'] = ServiceClientRegistry.open(self.config).statistics()
+        statistics['commits'] = CommitManager.open(self.config).statistics()
+        statistics['ledger'] = LedgerClient.open(self.config).statistics()
+        statistics['queries'] = ContractResponse.cache_statistics()
+        statistics['scheduler'] = EnclaveScheduler.open(self.config).statistics()
+        statistics['hedging'] = RequestHedger.open(self.config).statistics()
+        statistics['sequencer'] = ContractSequencer.open(self.config).statistics()
+        statistics['profiles'] = Profile.cache_statistics()
+        statistics['code'] = ContractCode.cache_statistics()
+        statistics['state'] = StateCache.open(self.config).statistics()
+        statistics['contracts'] = ContractRegistry.open(self.config).statistics()
+        statistics['jobs'] = InvocationQueue.open(self.config).statistics()
+        return jsonify(statistics)
+
+## ----------------------------------------------------------------
+## ----------------------------------------------------------------
+def register(app, config) :
+    logging.info('register statistics app')
+    app.add_url_rule('/statistics', None, statistics_app(config), methods=['GET'])